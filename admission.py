@@ -0,0 +1,330 @@
+"""
+Модуль допуска загрузок по месту на диске и пропускной способности.
+
+Перед загрузкой задача резервирует оценку размера видео (битрейт ×
+длительность или Content-Length). Задача допускается, если:
+- зарезервированное место на диске укладывается в бюджет и на диске
+  остаётся запас свободного места
+- объём ещё не загруженных данных всех задач укладывается в бюджет
+  пропускной способности (скорость × окно в секундах)
+
+Задачи, которые не помещаются, ждут освобождения места или загружаются
+в память без записи на диск (потоковый режим). Видео в памяти занимают
+отдельный бюджет памяти: задачи сверх него тоже ждут. Зарезервированный
+объём ещё не загруженных данных уменьшается по мере загрузки.
+
+Также модуль удаляет недокачанные файлы, оставшиеся после падения.
+
+Автор: maxim_vdonsk
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+# =============================================================================
+# КОНСТАНТЫ
+# =============================================================================
+
+logger = logging.getLogger(__name__)
+
+# Свободное место, которое всегда остаётся на диске (в байтах)
+DISK_FREE_RESERVE = 512 * 1024 * 1024
+
+# Бюджет памяти под видео, загружаемые без записи на диск (в байтах)
+MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Окно бюджета пропускной способности (в секундах): все допущенные
+# загрузки должны успевать завершиться за это время
+BANDWIDTH_WINDOW = 60
+
+# Интервал проверки места для ожидающих задач (в секундах)
+POLL_INTERVAL = 0.5
+
+# Возраст файла без изменений, после которого он считается брошенным
+# (в секундах)
+STALE_FILE_AGE = 600
+
+
+# =============================================================================
+# РЕЗЕРВ
+# =============================================================================
+
+class Reservation:
+    """Зарезервированный объём одной задачи."""
+
+    def __init__(self, controller: AdmissionController, size: int, disk: bool):
+        """
+        Инициализация резерва.
+
+        Args:
+            controller: Контроллер, выдавший резерв
+            size: Оценка размера видео (в байтах)
+            disk: Файл записывается на диск (иначе — в память)
+        """
+        self.size = size
+        self.disk = disk
+        self.downloaded = 0
+        self._controller = controller
+
+    @property
+    def pending(self) -> int:
+        """Ещё не загруженный объём."""
+        return max(self.size - self.downloaded, 0)
+
+    def progress(self, current: int, total: int) -> None:
+        """
+        Учитывает прогресс загрузки (вызывается из потока загрузки).
+
+        Args:
+            current: Загружено сегментов
+            total: Всего сегментов
+        """
+        with self._controller._lock:
+            self.downloaded = self.size * current // total if total else 0
+
+    def release(self) -> None:
+        """Освобождает резерв (повторный вызов ничего не делает)."""
+        self._controller._release(self)
+
+    def __enter__(self) -> Reservation:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+# =============================================================================
+# КОНТРОЛЛЕР
+# =============================================================================
+
+class AdmissionController:
+    """
+    Допуск загрузок по бюджетам диска и пропускной способности.
+
+    Потокобезопасен: резервы можно получать из event loop и из потоков.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        disk_budget: Optional[int] = None,
+        bandwidth: Optional[int] = None,
+        window: float = BANDWIDTH_WINDOW,
+        free_reserve: int = DISK_FREE_RESERVE,
+        memory_budget: Optional[int] = MEMORY_BUDGET,
+    ):
+        """
+        Инициализация контроллера.
+
+        Args:
+            path: Директория загрузок
+            disk_budget: Бюджет места на диске (в байтах, None — только
+                проверка свободного места)
+            bandwidth: Бюджет пропускной способности (байт в секунду,
+                None — без ограничения)
+            window: Окно бюджета пропускной способности (в секундах)
+            free_reserve: Свободное место, которое остаётся на диске
+            memory_budget: Бюджет памяти под видео без записи на диск
+                (в байтах, None — без ограничения)
+        """
+        self._path = path
+        self._disk_budget = disk_budget
+        self._memory_budget = memory_budget
+        self._inflight_budget = bandwidth * window if bandwidth else None
+        self._free_reserve = free_reserve
+        self._reservations: set = set()
+        self._lock = threading.Lock()
+
+    @property
+    def disk_reserved(self) -> int:
+        """Место на диске, зарезервированное задачами."""
+        with self._lock:
+            return self._disk_reserved()
+
+    @property
+    def memory_reserved(self) -> int:
+        """Память, зарезервированная задачами без записи на диск."""
+        with self._lock:
+            return self._memory_reserved()
+
+    @property
+    def inflight(self) -> int:
+        """Объём ещё не загруженных данных всех задач."""
+        with self._lock:
+            return self._inflight()
+
+    def _disk_reserved(self) -> int:
+        return sum(r.size for r in self._reservations if r.disk)
+
+    def _memory_reserved(self) -> int:
+        return sum(r.size for r in self._reservations if not r.disk)
+
+    def _inflight(self) -> int:
+        return sum(r.pending for r in self._reservations)
+
+    def _disk_free(self) -> int:
+        """
+        Свободное место с учётом ещё не записанных данных задач.
+
+        Файлы допущенных задач растут по мере загрузки, поэтому их
+        недописанная часть вычитается из свободного места.
+        """
+        # Директория загрузок может быть ещё не создана
+        path = os.path.abspath(self._path)
+        while not os.path.exists(path) and os.path.dirname(path) != path:
+            path = os.path.dirname(path)
+
+        try:
+            free = shutil.disk_usage(path).free
+        except OSError:
+            return 0
+        unwritten = sum(r.pending for r in self._reservations if r.disk)
+        return free - unwritten - self._free_reserve
+
+    def can_ever_fit(self, size: int, disk: bool = True) -> bool:
+        """Помещается ли задача в бюджет диска (памяти), когда он свободен."""
+        budget = self._disk_budget if disk else self._memory_budget
+        return budget is None or size <= budget
+
+    def _fits(self, size: int, disk: bool) -> bool:
+        """Помещается ли задача сейчас (вызывается под блокировкой)."""
+        if disk:
+            if (
+                self._disk_budget is not None
+                and self._disk_reserved() + size > self._disk_budget
+            ):
+                return False
+            if size > self._disk_free():
+                return False
+        elif (
+            self._memory_budget is not None
+            and self._memory_reserved() + size > self._memory_budget
+        ):
+            return False
+
+        # Большая задача допускается, когда других загрузок нет
+        if self._inflight_budget is not None and self._reservations:
+            if self._inflight() + size > self._inflight_budget:
+                return False
+        return True
+
+    def try_reserve(
+        self, size: int, disk: bool = True
+    ) -> Optional[Reservation]:
+        """
+        Резервирует объём, если задача помещается.
+
+        Args:
+            size: Оценка размера видео (в байтах)
+            disk: Файл записывается на диск
+
+        Returns:
+            Резерв или None
+        """
+        with self._lock:
+            if not self._fits(size, disk):
+                return None
+            reservation = Reservation(self, size, disk)
+            self._reservations.add(reservation)
+            return reservation
+
+    async def reserve(
+        self,
+        size: int,
+        timeout: float,
+        disk: bool = True,
+        cancel: Optional[threading.Event] = None,
+        memory_fallback: bool = False,
+    ) -> Optional[Reservation]:
+        """
+        Ожидает, пока задача поместится (для event loop).
+
+        Args:
+            size: Оценка размера видео (в байтах)
+            timeout: Максимальное время ожидания (в секундах)
+            disk: Файл записывается на диск
+            cancel: Событие отмены задачи (прерывает ожидание)
+            memory_fallback: Принять резерв в памяти, если он освободится
+                раньше места на диске
+
+        Returns:
+            Резерв или None по истечении времени или после отмены
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if cancel and cancel.is_set():
+                return None
+            reservation = self.try_reserve(size, disk)
+            if not reservation and disk and memory_fallback:
+                reservation = self.try_reserve(size, disk=False)
+            if reservation or time.monotonic() >= deadline:
+                return reservation
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def reserve_blocking(
+        self,
+        size: int,
+        timeout: float,
+        disk: bool = True,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[Reservation]:
+        """Ожидает, пока задача поместится (для синхронного кода)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if cancel and cancel.is_set():
+                return None
+            reservation = self.try_reserve(size, disk)
+            if reservation or time.monotonic() >= deadline:
+                return reservation
+            if cancel:
+                cancel.wait(POLL_INTERVAL)
+            else:
+                time.sleep(POLL_INTERVAL)
+
+    def _release(self, reservation: Reservation) -> None:
+        """Освобождает резерв."""
+        with self._lock:
+            self._reservations.discard(reservation)
+
+
+# =============================================================================
+# ОЧИСТКА
+# =============================================================================
+
+def sweep_partial_files(path: str, max_age: float = STALE_FILE_AGE) -> int:
+    """
+    Удаляет брошенные файлы из директории загрузок.
+
+    Файл считается брошенным, если не изменялся дольше max_age:
+    файлы текущих загрузок обновляются при записи каждого сегмента.
+
+    Args:
+        path: Директория загрузок
+        max_age: Возраст файла без изменений (в секундах)
+
+    Returns:
+        Количество удалённых файлов
+    """
+    if not os.path.isdir(path):
+        return 0
+
+    removed = 0
+    now = time.time()
+    for entry in os.scandir(path):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime >= max_age:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Не удалось удалить {entry.path}: {e}")
+
+    if removed:
+        logger.info(f"Удалено недокачанных файлов в {path}: {removed}")
+    return removed
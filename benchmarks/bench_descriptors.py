@@ -0,0 +1,106 @@
+"""
+Бенчмарк памяти: объекты видео против компактных дескрипторов.
+
+Сравнивает память на кэш из 10 000 видео в двух вариантах:
+- объекты RutubeVideo вместе с разобранным m3u8 плейлистом
+  (как их хранит Rutube)
+- RutubeVideoDescriptor
+
+Также измеряет скорость to_dict/from_dict и размер pickle.
+
+Запуск:
+    python benchmarks/bench_descriptors.py [--videos 10000] [--segments 300]
+
+Автор: maxim_vdonsk
+"""
+
+import argparse
+import gc
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import m3u8  # noqa: E402
+
+import rutube  # noqa: E402
+from bench_m3u8 import make_master_playlist  # noqa: E402
+
+
+def segment_uris(video: int, segments: int) -> list:
+    """Список сегментов видео (у каждого видео свои строки)."""
+    return [f'segment-{i}-{video}-v1-a1.ts' for i in range(segments)]
+
+
+def build_objects(count: int, segments: int) -> list:
+    """Кэш объектов RutubeVideo с разобранным мастер-плейлистом."""
+    text = make_master_playlist(4)
+    cache = []
+    for i in range(count):
+        master = m3u8.loads(text)
+        params = dict(video_id=str(i), title=f'Video {i}', duration=1200.0)
+        video = rutube.RutubeVideo(master.playlists[-1], master, params)
+        video._segment_urls = segment_uris(i, segments)
+        cache.append((master, video))
+    return cache
+
+
+def build_descriptors(count: int, segments: int) -> list:
+    """Кэш дескрипторов видео."""
+    master = rutube._parse_master_playlist(make_master_playlist(4))
+    cache = []
+    for i in range(count):
+        params = dict(video_id=str(i), title=f'Video {i}', duration=1200.0)
+        video = rutube.RutubeVideo(master.playlists[-1], master, params)
+        video._segment_urls = segment_uris(i, segments)
+        cache.append(video.describe())
+    return cache
+
+
+def measure(name: str, build, count: int, segments: int) -> list:
+    """Память, занятая кэшем (без временных объектов)."""
+    gc.collect()
+    tracemalloc.start()
+    cache = build(count, segments)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'  {name:<12} {size / 1024 / 1024:8.1f} MB')
+    return cache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Память кэша видео')
+    parser.add_argument('--videos', type=int, default=10000)
+    parser.add_argument('--segments', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f'Memory ({args.videos} videos, {args.segments} segments each):')
+    objects = measure('objects', build_objects, args.videos, args.segments)
+    del objects
+    descriptors = measure(
+        'descriptors', build_descriptors, args.videos, args.segments
+    )
+
+    print('Round trip:')
+    started = time.perf_counter()
+    dicts = [descriptor.to_dict() for descriptor in descriptors]
+    restored = [rutube.RutubeVideoDescriptor.from_dict(d) for d in dicts]
+    elapsed = time.perf_counter() - started
+    assert restored == descriptors
+    print(f'  to/from_dict {elapsed / len(descriptors) * 1e6:8.1f} us/video')
+
+    started = time.perf_counter()
+    data = pickle.dumps(descriptors, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.loads(data)
+    elapsed = time.perf_counter() - started
+    print(f'  pickle       {elapsed / len(descriptors) * 1e6:8.1f} us/video, '
+          f'{len(data) / len(descriptors):.0f} bytes/video')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Бенчмарк загрузки сегментов по HTTP/1.1 и HTTP/2.
+
+Запускает локальный HLS-сервер (см. hls_server.py) в отдельном процессе
+и загружает одно и то же видео несколько раз параллельно:
+- HTTP/1.1 — клиент requests, сервер HTTP/1.1
+- HTTP/2 — клиент и сервер HTTP/2
+- fallback — HTTP/2 включён (HTTP2_ENABLED=1), но сервер отвечает только
+  по HTTP/1.1: время должно совпадать с HTTP/1.1
+
+Запуск:
+    python benchmarks/bench_http2.py [--downloads 4] [--segments 100]
+
+Автор: maxim_vdonsk
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import rutube  # noqa: E402
+
+
+def start_server(args, http2: bool) -> subprocess.Popen:
+    """Запускает HLS-сервер и возвращает процесс."""
+    command = [
+        sys.executable, os.path.join(HERE, 'hls_server.py'), '--port', '0',
+        '--segments', str(args.segments), '--latency', str(args.latency),
+    ]
+    if http2:
+        command.append('--http2')
+    return subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+
+
+def download_all(master_url: str, downloads: int, workers: int) -> float:
+    """Параллельно загружает лучший вариант; возвращает время (с)."""
+    master = rutube._parse_master_playlist(
+        rutube._http_get(master_url).text
+    )
+    params = dict(video_id='bench', title='bench', duration=None)
+
+    def download(_):
+        video = rutube.RutubeVideo(master.playlists[-1], master, params)
+        video._write_threads(
+            lambda: None, io.BytesIO(), workers, None, Event()
+        )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=downloads) as pool:
+        list(pool.map(download, range(downloads)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='HTTP/1.1 vs HTTP/2')
+    parser.add_argument('--downloads', type=int, default=4)
+    parser.add_argument('--segments', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    # (название, сервер по HTTP/2, клиент: None — requests,
+    # иначе use_http2(prior_knowledge))
+    modes = (
+        ('HTTP/1.1', False, None),
+        ('HTTP/2', True, True),
+        ('fallback', False, False),
+    )
+    for name, http2, prior_knowledge in modes:
+        if prior_knowledge is not None and not rutube.use_http2(
+            prior_knowledge=prior_knowledge
+        ):
+            print(f'{name:<9} skipped (h2 is not installed)')
+            continue
+
+        server = start_server(args, http2)
+        try:
+            master_url = server.stdout.readline().strip()
+            elapsed = download_all(master_url, args.downloads, args.workers)
+            stats = json.loads(rutube._http_get(
+                master_url.replace('master.m3u8', 'stats')
+            ).text)
+        finally:
+            rutube.use_http2(False)
+            server.terminate()
+            server.wait()
+
+        print(
+            f'{name:<9} {elapsed:7.2f} s  '
+            f'connections: {stats["connections"]:<5} '
+            f'requests: {stats["requests"]}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Бенчмарк разбора m3u8 и времени импорта rutube.py.
+
+Сравнивает встроенный парсер с библиотекой m3u8 на больших плейлистах
+и измеряет время импорта модуля в отдельном процессе.
+
+Запуск:
+    python benchmarks/bench_m3u8.py
+
+Автор: maxim_vdonsk
+"""
+
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import m3u8  # noqa: E402
+
+from rutube import _parse_master_playlist, _parse_segment_uris  # noqa: E402
+
+# Количество повторов каждого замера
+REPEAT = 5
+
+
+def make_master_playlist(variants: int) -> str:
+    """Мастер-плейлист с заданным количеством вариантов."""
+    lines = ['#EXTM3U']
+    for i in range(variants):
+        height = 144 + i
+        lines.append(
+            f'#EXT-X-STREAM-INF:BANDWIDTH={100000 + i * 1000},'
+            f'RESOLUTION={height * 16 // 9}x{height},'
+            f'CODECS="avc1.4d401f,mp4a.40.2"'
+        )
+        lines.append(
+            f'https://cdn.example.com/video/{i}.mp4.m3u8?i={height}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def make_media_playlist(segments: int) -> str:
+    """Плейлист варианта с заданным количеством сегментов."""
+    lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:6', '#EXT-X-VERSION:3']
+    for i in range(segments):
+        lines.append('#EXTINF:6.000,')
+        lines.append(f'segment-{i}-v1-a1.ts')
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def bench(name: str, func, number: int) -> float:
+    """Лучшее время одного вызова (в миллисекундах)."""
+    best = min(timeit.repeat(func, number=number, repeat=REPEAT)) / number
+    print(f'  {name:<12} {best * 1000:10.3f} ms')
+    return best
+
+
+def bench_parsers() -> None:
+    """Сравнение парсеров."""
+    master = make_master_playlist(500)
+    media = make_media_playlist(20000)
+
+    print('Master playlist (500 variants):')
+    fast = bench('builtin', lambda: _parse_master_playlist(master), 20)
+    slow = bench('m3u8', lambda: m3u8.loads(master), 20)
+    print(f'  speedup      {slow / fast:10.1f}x')
+
+    print('Media playlist (20000 segments):')
+    fast = bench('builtin', lambda: _parse_segment_uris(media), 5)
+    slow = bench(
+        'm3u8',
+        lambda: [s['uri'] for s in m3u8.loads(media).data['segments']],
+        5
+    )
+    print(f'  speedup      {slow / fast:10.1f}x')
+
+
+def bench_import() -> None:
+    """Время импорта rutube.py и его тяжёлых зависимостей."""
+    code = (
+        'import time; t = time.perf_counter(); import {}; '
+        'print(time.perf_counter() - t)'
+    )
+
+    print('Import time (cold process):')
+    for module in ('rutube', 'm3u8, requests, alive_progress'):
+        times = [
+            float(subprocess.check_output(
+                [sys.executable, '-c', code.format(module)], cwd=ROOT
+            ))
+            for _ in range(REPEAT)
+        ]
+        print(f'  {module:<32} {min(times) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    bench_parsers()
+    bench_import()
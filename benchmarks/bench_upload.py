@@ -0,0 +1,73 @@
+"""
+Бенчмарк отправки видео: multipart против передачи пути.
+
+Отправляет один и тот же файл через собственный Bot API сервер
+(запущенный с --local) двумя способами и сравнивает время.
+
+Запуск:
+    export TELEGRAM_BOT_TOKEN=... TELEGRAM_API_URL=http://localhost:8081/bot
+    python benchmarks/bench_upload.py --file video.mp4 --chat-id 123456
+
+Автор: maxim_vdonsk
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from telegram import Bot
+
+# Таймауты отправки файла (в секундах)
+UPLOAD_TIMEOUT = 600
+
+
+async def send(bot: Bot, chat_id: int, video) -> float:
+    """Отправляет видео и возвращает время (с)."""
+    started = time.perf_counter()
+    message = await bot.send_video(
+        chat_id=chat_id,
+        video=video,
+        read_timeout=UPLOAD_TIMEOUT,
+        write_timeout=UPLOAD_TIMEOUT,
+        connect_timeout=UPLOAD_TIMEOUT,
+    )
+    elapsed = time.perf_counter() - started
+    await message.delete()
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='multipart vs local path')
+    parser.add_argument('--file', required=True)
+    parser.add_argument('--chat-id', type=int, required=True)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    load_dotenv()
+    token = os.environ['TELEGRAM_BOT_TOKEN']
+    base_url = os.environ['TELEGRAM_API_URL']
+    path = Path(args.file).resolve()
+    size = path.stat().st_size / 1024 / 1024
+
+    for name, local_mode in (('multipart', False), ('local path', True)):
+        async with Bot(token, base_url=base_url, local_mode=local_mode) as bot:
+            times = []
+            for _ in range(args.repeat):
+                if local_mode:
+                    times.append(await send(bot, args.chat_id, path))
+                else:
+                    with open(path, 'rb') as video_file:
+                        times.append(
+                            await send(bot, args.chat_id, video_file)
+                        )
+        print(
+            f'{name:<11} {size:8.1f} MB  '
+            f'best {min(times):7.2f} s  mean {sum(times) / len(times):7.2f} s'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
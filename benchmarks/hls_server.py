@@ -0,0 +1,317 @@
+"""
+Локальный HLS-сервер, заменяющий CDN Rutube в бенчмарках.
+
+Отдаёт мастер-плейлист, плейлисты вариантов и сегменты с заданным
+размером и задержкой. Работает по HTTP/1.1 или по HTTP/2 без TLS
+(prior knowledge, нужен пакет h2).
+
+Также отвечает как сайт и API Rutube для класса Rutube: страница
+видео /video/<id>/ и данные /api/play/options/<id>/ со ссылкой
+на мастер-плейлист (см. API_URL_TEMPLATE).
+
+Запуск:
+    python benchmarks/hls_server.py --port 8000 [--http2]
+
+Мастер-плейлист: http://127.0.0.1:8000/master.m3u8
+Страница видео: http://127.0.0.1:8000/video/abc123/
+Счётчики соединений и запросов: http://127.0.0.1:8000/stats
+
+Автор: maxim_vdonsk
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+# Разрешения вариантов по умолчанию
+RENDITIONS = ((640, 360), (1280, 720), (1920, 1080))
+
+# Шаблон URL данных о видео (замена rutube.DATA_URL_TEMPLATE)
+API_URL_TEMPLATE = '{base_url}/api/play/options/{{}}/'
+
+# Длительность сегмента (в секундах)
+SEGMENT_DURATION = 4
+
+
+class HlsContent:
+    """Содержимое HLS: плейлисты и сегменты для всех вариантов."""
+
+    def __init__(
+        self,
+        segments: int = 100,
+        segment_size: int = 256 * 1024,
+        latency: float = 0.02,
+        renditions=RENDITIONS,
+    ):
+        """
+        Инициализация содержимого.
+
+        Args:
+            segments: Количество сегментов в каждом варианте
+            segment_size: Размер сегмента (в байтах)
+            latency: Задержка ответа на сегмент (в секундах)
+            renditions: Разрешения вариантов
+        """
+        self.segments = segments
+        self.segment_size = segment_size
+        self.latency = latency
+        self.renditions = renditions
+        self.base_url = ''
+        self.connections = 0
+        self.requests = 0
+        self._filler = b'\0' * (segment_size - 8)
+        self._lock = threading.Lock()
+
+    def master_playlist(self) -> bytes:
+        """Мастер-плейлист со всеми вариантами."""
+        lines = ['#EXTM3U']
+        for width, height in self.renditions:
+            lines.append(
+                f'#EXT-X-STREAM-INF:BANDWIDTH={height * 2000},'
+                f'RESOLUTION={width}x{height},'
+                f'CODECS="avc1.4d401f,mp4a.40.2"'
+            )
+            lines.append(f'{self.base_url}/{height}.m3u8')
+        return ('\n'.join(lines) + '\n').encode()
+
+    def media_playlist(self) -> bytes:
+        """Плейлист варианта."""
+        lines = ['#EXTM3U', f'#EXT-X-TARGETDURATION:{SEGMENT_DURATION}']
+        for i in range(self.segments):
+            lines.append(f'#EXTINF:{SEGMENT_DURATION:.3f},')
+            lines.append(f'segment-{i}.ts')
+        lines.append('#EXT-X-ENDLIST')
+        return ('\n'.join(lines) + '\n').encode()
+
+    def segment(self, index: int) -> bytes:
+        """Сегмент: номер (8 байт) и заполнитель."""
+        return index.to_bytes(8, 'big') + self._filler
+
+    def video_data(self, video_id: str) -> bytes:
+        """Данные о видео в формате API Rutube."""
+        return json.dumps(dict(
+            title=f'Video {video_id}',
+            duration=self.segments * SEGMENT_DURATION * 1000,
+            video_balancer=dict(m3u8=f'{self.base_url}/master.m3u8'),
+        )).encode()
+
+    def count(self, connection: bool = False) -> None:
+        """Учёт запросов и соединений."""
+        with self._lock:
+            if connection:
+                self.connections += 1
+            else:
+                self.requests += 1
+
+    def stats(self) -> bytes:
+        """Счётчики соединений и запросов в JSON."""
+        return json.dumps(
+            dict(connections=self.connections, requests=self.requests)
+        ).encode()
+
+    def handle(self, path: str) -> Tuple[int, bytes, float]:
+        """
+        Ответ на запрос.
+
+        Returns:
+            Статус, тело и задержка перед ответом
+        """
+        path = path.split('?')[0]
+        if path == '/stats':
+            return 200, self.stats(), 0
+
+        self.count()
+
+        if path.startswith('/video/'):
+            return 200, b'<html></html>', 0
+        if path.startswith('/api/play/options/'):
+            return 200, self.video_data(path.strip('/').split('/')[-1]), 0
+        if path == '/master.m3u8':
+            return 200, self.master_playlist(), 0
+        if path.endswith('.m3u8'):
+            return 200, self.media_playlist(), 0
+        if '/segment-' in path:
+            index = int(path.rsplit('segment-', 1)[1].split('.')[0])
+            if index < self.segments:
+                return 200, self.segment(index), self.latency
+        return 404, b'', 0
+
+
+# =============================================================================
+# HTTP/1.1
+# =============================================================================
+
+def serve_http1(
+    content: HlsContent,
+    host: str = '127.0.0.1',
+    port: int = 0
+) -> ThreadingHTTPServer:
+    """Запускает HTTP/1.1 сервер в фоновом потоке."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            content.count(connection=True)
+
+        def do_GET(self):
+            status, body, delay = content.handle(self.path)
+            if delay:
+                time.sleep(delay)
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_HEAD(self):
+            status, body, _ = content.handle(self.path)
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    server = Server((host, port), Handler)
+    content.base_url = f'http://{host}:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# =============================================================================
+# HTTP/2 (prior knowledge)
+# =============================================================================
+
+class _H2Protocol(asyncio.Protocol):
+    """Соединение HTTP/2 с учётом управления потоком."""
+
+    def __init__(self, content: HlsContent):
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+
+        self._content = content
+        self._conn = H2Connection(H2Configuration(client_side=False))
+        self._windows = {}
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._content.count(connection=True)
+        self._transport = transport
+        self._conn.initiate_connection()
+        self._flush()
+
+    def data_received(self, data: bytes):
+        from h2.events import (
+            ConnectionTerminated, RequestReceived, StreamReset, WindowUpdated
+        )
+
+        for event in self._conn.receive_data(data):
+            if isinstance(event, RequestReceived):
+                headers = dict(event.headers)
+                asyncio.ensure_future(self._respond(
+                    event.stream_id,
+                    headers[b':path'].decode(),
+                    headers[b':method'] == b'HEAD',
+                ))
+            elif isinstance(event, WindowUpdated):
+                for window in self._windows.values():
+                    window.set()
+            elif isinstance(event, StreamReset):
+                window = self._windows.pop(event.stream_id, None)
+                if window:
+                    window.set()
+            elif isinstance(event, ConnectionTerminated):
+                self._transport.close()
+        self._flush()
+
+    def _flush(self):
+        data = self._conn.data_to_send()
+        if data:
+            self._transport.write(data)
+
+    async def _respond(self, stream_id: int, path: str, head: bool):
+        from h2.exceptions import StreamClosedError
+
+        status, body, delay = self._content.handle(path)
+        if delay and not head:
+            await asyncio.sleep(delay)
+
+        try:
+            await self._send(stream_id, status, body, head)
+        except StreamClosedError:
+            self._windows.pop(stream_id, None)
+
+    async def _send(
+        self, stream_id: int, status: int, body: bytes, head: bool
+    ):
+        self._conn.send_headers(stream_id, [
+            (':status', str(status)),
+            ('content-length', str(len(body))),
+        ], end_stream=head)
+        if head:
+            self._flush()
+            return
+        self._windows[stream_id] = asyncio.Event()
+        body = memoryview(body)
+
+        while body:
+            size = min(
+                self._conn.local_flow_control_window(stream_id),
+                self._conn.max_outbound_frame_size,
+                len(body),
+            )
+            if size <= 0:
+                self._windows[stream_id].clear()
+                self._flush()
+                await self._windows[stream_id].wait()
+                if stream_id not in self._windows:
+                    return
+                continue
+            self._conn.send_data(stream_id, bytes(body[:size]))
+            body = body[size:]
+
+        self._conn.end_stream(stream_id)
+        self._windows.pop(stream_id, None)
+        self._flush()
+
+
+def serve_http2(
+    content: HlsContent,
+    host: str = '127.0.0.1',
+    port: int = 0
+) -> asyncio.AbstractServer:
+    """Запускает HTTP/2 сервер (prior knowledge) в фоновом потоке."""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        loop.create_server(lambda: _H2Protocol(content), host, port)
+    )
+    content.base_url = f'http://{host}:{server.sockets[0].getsockname()[1]}'
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Локальный HLS-сервер')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--segments', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--http2', action='store_true')
+    args = parser.parse_args()
+
+    hls = HlsContent(segments=args.segments, latency=args.latency)
+    (serve_http2 if args.http2 else serve_http1)(hls, port=args.port)
+    print(f'{hls.base_url}/master.m3u8', flush=True)
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,421 @@
+"""
+Нагрузочный тест обработчиков бота.
+
+Передаёт синтетические Update (ссылка, нажатие кнопки) в Application,
+собранный как в bot.main, для нескольких одновременных пользователей
+и постепенно увеличивает их количество. События проходят через
+update_queue, поэтому замер учитывает политику обработки событий
+приложения. Telegram заменён FakeBot, который записывает вызовы
+и имитирует задержку отправки файла.
+Rutube заменён локальным HLS-сервером (см. hls_server.py), который
+отвечает как сайт, API и CDN.
+
+Для каждой ступени выводятся:
+- время ответа на ссылку (handle_link)
+- время выполнения задачи (handle_resolution до отправки видео)
+- задержка event loop
+- пиковое количество потоков и память процесса
+
+Запуск:
+    python benchmarks/load_test.py [--users 1,2,4,8,16,32] [--segments 20]
+
+Автор: maxim_vdonsk
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import alive_progress  # noqa: E402
+from telegram import (  # noqa: E402
+    CallbackQuery, Chat, Message, MessageEntity, Update, User,
+)
+from telegram.ext import Application  # noqa: E402
+
+import bot  # noqa: E402
+import rutube  # noqa: E402
+from hls_server import API_URL_TEMPLATE  # noqa: E402
+
+# Интервал замеров потоков, памяти и задержки event loop (в секундах)
+SAMPLE_INTERVAL = 0.1
+
+# Номера сообщений синтетических чатов (как в Telegram, свои в каждом чате)
+_message_ids = defaultdict(lambda: itertools.count(1))
+
+# Номера событий и ожидание окончания их обработки (update_id -> Event)
+_update_ids = itertools.count(1)
+_processed = {}
+
+
+# =============================================================================
+# TELEGRAM
+# =============================================================================
+
+class FakeBot:
+    """
+    Bot, который записывает вызовы и имитирует задержку ответа.
+
+    Реализует методы Bot API, которые обработчики вызывают через объекты
+    telegram (Message.reply_text, CallbackQuery.answer и т. д.).
+    """
+
+    username = 'load_test_bot'
+
+    def __init__(self, latency: float, upload_rate: float):
+        """
+        Инициализация бота.
+
+        Args:
+            latency: Задержка ответа на любой запрос (в секундах)
+            upload_rate: Скорость отправки файла (байт в секунду)
+        """
+        self.latency = latency
+        self.upload_rate = upload_rate
+        self.calls = Counter()
+        self.delivered = {}
+        # Текущий текст сообщений ((chat_id, message_id) -> текст)
+        self.texts = {}
+        # Последнее сообщение с клавиатурой в чате (chat_id -> Message)
+        self.keyboards = {}
+
+    async def initialize(self) -> None:
+        """Вызывается Application.initialize()."""
+
+    async def shutdown(self) -> None:
+        """Вызывается Application.shutdown()."""
+
+    async def call(self, method: str, result=None):
+        """Учитывает запрос и отвечает с задержкой."""
+        self.calls[method] += 1
+        await asyncio.sleep(self.latency)
+        return result
+
+    def message(self, chat_id: int, text: str, reply_markup=None,
+                message_id: Optional[int] = None) -> Message:
+        """Сообщение бота в синтетическом чате."""
+        message = Message(
+            message_id or next(_message_ids[chat_id]),
+            datetime.now(timezone.utc),
+            Chat(chat_id, Chat.PRIVATE),
+            text=text,
+            reply_markup=reply_markup,
+        )
+        message.set_bot(self)
+        self.texts[(chat_id, message.message_id)] = text
+        return message
+
+    async def send_message(self, chat_id: int, text: str, reply_markup=None,
+                           **kwargs):
+        message = self.message(chat_id, text, reply_markup)
+        if reply_markup:
+            self.keyboards[chat_id] = message
+        return await self.call('sendMessage', message)
+
+    async def edit_message_text(self, text: str, chat_id: int = None,
+                                message_id: int = None, reply_markup=None,
+                                **kwargs):
+        message = self.message(chat_id, text, reply_markup, message_id)
+        if reply_markup:
+            self.keyboards[chat_id] = message
+        return await self.call('editMessageText', message)
+
+    async def answer_callback_query(self, callback_query_id: str, **kwargs):
+        return await self.call('answerCallbackQuery', True)
+
+    async def send_video(self, chat_id: int, video, caption=None, **kwargs):
+        """Имитирует отправку видео со скоростью upload_rate."""
+        if hasattr(video, 'getbuffer'):
+            size = video.getbuffer().nbytes
+        elif hasattr(video, 'fileno'):
+            size = os.fstat(video.fileno()).st_size
+        else:
+            size = os.path.getsize(video)
+        await self.call('sendVideo')
+        await asyncio.sleep(size / self.upload_rate)
+        self.delivered[chat_id] = time.perf_counter()
+
+
+def user_message(fake_bot: FakeBot, user_id: int, text: str) -> Update:
+    """Сообщение пользователя (команды размечаются, как в Telegram)."""
+    entities = []
+    if text.startswith('/'):
+        entities.append(MessageEntity(
+            MessageEntity.BOT_COMMAND, 0, len(text.split()[0])
+        ))
+    message = Message(
+        next(_message_ids[user_id]),
+        datetime.now(timezone.utc),
+        Chat(user_id, Chat.PRIVATE),
+        from_user=User(user_id, f'user{user_id}', False),
+        text=text,
+        entities=entities,
+    )
+    message.set_bot(fake_bot)
+    return Update(next(_update_ids), message=message)
+
+
+def button_press(fake_bot: FakeBot, user_id: int, message: Message,
+                 data: str) -> Update:
+    """Нажатие кнопки клавиатуры под сообщением бота."""
+    query = CallbackQuery(
+        str(next(_update_ids)),
+        User(user_id, f'user{user_id}', False),
+        str(user_id),
+        message=message,
+        data=data,
+    )
+    query.set_bot(fake_bot)
+    return Update(next(_update_ids), callback_query=query)
+
+
+class DispatchApplication(Application):
+    """Application, который сообщает об окончании обработки события."""
+
+    async def process_update(self, update: object) -> None:
+        try:
+            await super().process_update(update)
+        finally:
+            done = _processed.pop(getattr(update, 'update_id', None), None)
+            if done:
+                done.set()
+
+
+def build_application(fake_bot: FakeBot) -> Application:
+    """Приложение с обработчиками и политикой обработки, как в bot.main."""
+    return bot.build_application(
+        Application.builder()
+        .bot(fake_bot)
+        .updater(None)
+        .application_class(DispatchApplication)
+    )
+
+
+async def dispatch(application: Application, update: Update) -> None:
+    """
+    Передаёт событие приложению, как Updater, и ждёт окончания обработки.
+
+    Событие проходит через update_queue, поэтому замер включает политику
+    обработки событий приложения (очередь и параллельность).
+    """
+    done = _processed[update.update_id] = asyncio.Event()
+    await application.update_queue.put(update)
+    await done.wait()
+
+
+# =============================================================================
+# ПОЛЬЗОВАТЕЛИ
+# =============================================================================
+
+async def run_user(
+    application: Application,
+    fake_bot: FakeBot,
+    user_id: int,
+    video_url: str,
+    rendition: int
+) -> dict:
+    """
+    Сценарий пользователя: ссылка, выбор разрешения, получение видео.
+
+    Returns:
+        Время ответа на ссылку, время задачи и результат
+    """
+    result = dict(link=None, job=None, ok=False)
+
+    started = time.perf_counter()
+    await dispatch(application, user_message(fake_bot, user_id, video_url))
+    result['link'] = time.perf_counter() - started
+
+    reply = fake_bot.keyboards.get(user_id)
+    if not reply:
+        return result
+
+    # Telegram возвращает callback_data строкой
+    buttons = [row[0] for row in reply.reply_markup.inline_keyboard]
+    button = buttons[min(rendition, len(buttons) - 1)]
+
+    started = time.perf_counter()
+    await dispatch(application, button_press(
+        fake_bot, user_id, reply, str(button.callback_data)
+    ))
+    result['job'] = time.perf_counter() - started
+    result['ok'] = user_id in fake_bot.delivered
+    return result
+
+
+# =============================================================================
+# ЗАМЕРЫ
+# =============================================================================
+
+def current_rss() -> int:
+    """Текущая память процесса (в байтах)."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Sampler:
+    """Пиковые значения потоков, памяти и задержки event loop."""
+
+    def __init__(self):
+        self.threads = 0
+        self.rss = 0
+        self.loop_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            self.threads = max(self.threads, threading.active_count())
+            self.rss = max(self.rss, current_rss())
+            started = time.perf_counter()
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            self.loop_lag = max(
+                self.loop_lag,
+                time.perf_counter() - started - SAMPLE_INTERVAL
+            )
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *args):
+        self._task.cancel()
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль (ближайший ранг)."""
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+# =============================================================================
+# ТОЧКА ВХОДА
+# =============================================================================
+
+def start_server(args) -> subprocess.Popen:
+    """Запускает HLS-сервер и возвращает процесс."""
+    return subprocess.Popen([
+        sys.executable, os.path.join(HERE, 'hls_server.py'), '--port', '0',
+        '--segments', str(args.segments), '--latency', str(args.latency),
+    ], stdout=subprocess.PIPE, text=True)
+
+
+async def run_step(
+    users: int,
+    first_user: int,
+    base_url: str,
+    application: Application,
+    fake_bot: FakeBot,
+    rendition: int
+) -> tuple:
+    """Одновременный запуск сценария для users пользователей."""
+    with Sampler() as sampler:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            run_user(
+                application, fake_bot, user_id, f'{base_url}/video/load{user_id}/',
+                rendition
+            )
+            for user_id in range(first_user, first_user + users)
+        ))
+        elapsed = time.perf_counter() - started
+    return results, sampler, elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Нагрузочный тест бота')
+    parser.add_argument('--users', default='1,2,4,8,16,32')
+    parser.add_argument('--segments', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Задержка ответа CDN на сегмент (с)')
+    parser.add_argument('--api-latency', type=float, default=0.05,
+                        help='Задержка ответа Telegram (с)')
+    parser.add_argument('--upload-rate', type=float, default=20.0,
+                        help='Скорость отправки в Telegram (MB/s)')
+    parser.add_argument('--rendition', type=int, default=0,
+                        help='Номер кнопки разрешения (0 — худшее)')
+    parser.add_argument('--collapse', type=float, default=5.0,
+                        help='Остановиться, когда p95 задачи вырастет '
+                             'во столько раз')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    alive_progress.config_handler.set_global(disable=True)
+
+    server = start_server(args)
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    os.chdir(workdir)
+    try:
+        base_url = server.stdout.readline().strip().rsplit('/', 1)[0]
+        rutube.DATA_URL_TEMPLATE = API_URL_TEMPLATE.format(base_url=base_url)
+        fake_bot = FakeBot(args.api_latency, args.upload_rate * 1024 * 1024)
+        application = build_application(fake_bot)
+        await application.initialize()
+        await application.start()
+
+        print(
+            f'{"users":>5} {"ok":>5} {"link p50":>9} {"link p95":>9} '
+            f'{"job p50":>8} {"job p95":>8} {"job p99":>8} '
+            f'{"jobs/s":>7} {"loop lag":>9} {"threads":>8} {"RSS MB":>7}'
+        )
+        baseline = None
+        first_user = 1
+        for users in map(int, args.users.split(',')):
+            results, sampler, elapsed = await run_step(
+                users, first_user, base_url, application, fake_bot,
+                args.rendition
+            )
+            first_user += users
+
+            links = [r['link'] for r in results if r['link'] is not None]
+            jobs = [r['job'] for r in results if r['ok']]
+            ok = sum(r['ok'] for r in results)
+            p95 = percentile(jobs, 95)
+            print(
+                f'{users:>5} {ok:>5} '
+                f'{percentile(links, 50):>9.2f} {percentile(links, 95):>9.2f} '
+                f'{percentile(jobs, 50):>8.2f} {p95:>8.2f} '
+                f'{percentile(jobs, 99):>8.2f} {ok / elapsed:>7.2f} '
+                f'{sampler.loop_lag:>9.2f} {sampler.threads:>8} '
+                f'{sampler.rss / 1024 / 1024:>7.0f}'
+            )
+
+            if ok < users:
+                print(f'Ошибок при {users} пользователях: {users - ok}')
+                break
+            baseline = baseline or p95
+            if p95 > baseline * args.collapse:
+                print(f'Задержка выросла в {p95 / baseline:.1f} раза '
+                      f'при {users} пользователях')
+                break
+
+        print(f'Запросы к Telegram: {dict(fake_bot.calls)}')
+        await application.stop()
+        await application.shutdown()
+    finally:
+        server.terminate()
+        server.wait()
+        os.chdir(HERE)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -7,20 +7,30 @@
 Автор: maxim_vdonsk
 """
 
+import io
 import os
+import time
 import logging
 import asyncio
+import threading
+from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
+    ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
     filters,
 )
-from rutube import Rutube
+import tracing
+from admission import AdmissionController, sweep_partial_files
+from jobs import JobQueue, JobStatus, SQLiteJobQueue
+from ratelimit import TelegramScheduler
+from rutube import DownloadCancelled, Rutube, use_http2
 
 # =============================================================================
 # КОНФИГУРАЦИЯ И ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
@@ -37,11 +47,115 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Временное хранилище ссылок для пользователей (user_id -> Rutube объект)
+# Временное хранилище ссылок для пользователей
+# (user_id -> (Rutube объект, ID трассы ссылки))
 user_links: dict = {}
 
-# Максимальный размер файла для отправки через Telegram (50 MB)
-MAX_TELEGRAM_FILE_SIZE = 50 * 1024 * 1024
+# Адрес собственного Bot API сервера (например, http://localhost:8081/bot)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+TELEGRAM_API_FILE_URL = os.getenv("TELEGRAM_API_FILE_URL") or (
+    TELEGRAM_API_URL and TELEGRAM_API_URL.replace("/bot", "/file/bot")
+)
+
+# Локальный режим сервера (--local): файл передаётся по пути, без загрузки
+TELEGRAM_LOCAL_MODE = (
+    bool(TELEGRAM_API_URL) and os.getenv("TELEGRAM_LOCAL_MODE", "0") == "1"
+)
+
+# Максимальный размер файла для отправки через Telegram
+# (50 MB, в локальном режиме Bot API сервера — 2000 MB)
+MAX_TELEGRAM_FILE_SIZE = (
+    2000 if TELEGRAM_LOCAL_MODE else 50
+) * 1024 * 1024
+
+# Таймауты отправки файла (в секундах)
+UPLOAD_TIMEOUT = 60
+
+# Директория для временных файлов
+DOWNLOAD_DIR = "downloads"
+
+# Бюджет места на диске под загрузки (в байтах, 0 — только проверка
+# свободного места)
+DOWNLOAD_DISK_BUDGET = int(os.getenv("DOWNLOAD_DISK_BUDGET", 0))
+
+# Бюджет пропускной способности загрузок (байт в секунду, 0 — без
+# ограничения)
+DOWNLOAD_BANDWIDTH = int(os.getenv("DOWNLOAD_BANDWIDTH", 0))
+
+# Максимальное время ожидания места под загрузку (в секундах)
+ADMISSION_TIMEOUT = int(os.getenv("ADMISSION_TIMEOUT", 600))
+
+# Загружать видео в память, если место на диске занято
+STREAM_FALLBACK = os.getenv("STREAM_FALLBACK", "1") == "1"
+
+# Бюджет памяти под видео, загружаемые в память (в байтах)
+DOWNLOAD_MEMORY_BUDGET = int(
+    os.getenv("DOWNLOAD_MEMORY_BUDGET", 256 * 1024 * 1024)
+)
+
+# Длительность превью (в секундах)
+PREVIEW_SECONDS = int(os.getenv("PREVIEW_SECONDS", 15))
+
+# Кнопка превью показывается для видео длиннее (в секундах)
+PREVIEW_MIN_DURATION = 120
+
+# callback_data кнопки превью
+PREVIEW_CALLBACK = "preview"
+
+# Допуск загрузок по месту на диске и пропускной способности
+admission = AdmissionController(
+    DOWNLOAD_DIR, DOWNLOAD_DISK_BUDGET or None, DOWNLOAD_BANDWIDTH or None,
+    memory_budget=DOWNLOAD_MEMORY_BUDGET,
+)
+
+# Путь к базе очереди задач. Если задан, загрузкой занимаются отдельные
+# процессы-воркеры (см. worker.py), а бот только ставит задачи в очередь
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB")
+
+# Интервал опроса состояния задачи в очереди (в секундах)
+JOB_POLL_INTERVAL = 1.0
+
+# Максимальное время ожидания задачи в очереди и у воркера (в секундах)
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", 1800))
+
+# Очередь задач (создаётся в main, если задан JOB_QUEUE_DB)
+job_queue: JobQueue = None
+
+# Предзагрузка первых сегментов, пока пользователь выбирает разрешение
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"
+
+# Максимальный объём предзагрузки на пользователя (в байтах)
+PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_BYTES", 8 * 1024 * 1024))
+
+# Общий лимит предзагрузки всех пользователей (в байтах)
+PREFETCH_TOTAL_BYTES = int(
+    os.getenv("PREFETCH_TOTAL_BYTES", 64 * 1024 * 1024)
+)
+
+# Через сколько секунд освобождается предзагрузка, если разрешение
+# так и не выбрано
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", 300))
+
+# HTTP/2 для загрузки плейлистов и сегментов (нужен пакет h2)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "0") == "1"
+
+# Резервировать файл и писать сегменты по смещениям по мере загрузки
+PREALLOCATE_DOWNLOADS = os.getenv("PREALLOCATE_DOWNLOADS", "0") == "1"
+
+# Файл трассировки задач в формате JSON Lines (см. trace_report.py)
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+# Планировщик исходящих запросов к Telegram (лимиты и приоритеты)
+telegram_scheduler = TelegramScheduler()
+
+# Последнее выбранное разрешение (user_id -> высота кадра)
+user_history: dict = {}
+
+# Активные предзагрузки (user_id -> (видео, событие отмены, лимит в байтах))
+user_prefetches: dict = {}
+
+# Активные загрузки (user_id -> множество событий отмены)
+user_downloads: dict = {}
 
 
 # =============================================================================
@@ -54,42 +168,97 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     Отправляет приветственное сообщение пользователю.
     """
-    await update.message.reply_text(
+    await telegram_scheduler.send(
+        update.effective_chat.id,
+        update.message.reply_text,
         "Привет! Я бот для скачивания Shorts.\n"
         "Отправь мне ссылку на Rutube-видео."
     )
 
 
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Обработчик команды /cancel.
+
+    Останавливает загрузки и предзагрузку пользователя.
+    """
+    user_id = update.effective_user.id
+    cancel_prefetch(user_id)
+
+    if cancel_downloads(user_id):
+        logger.info(f"Пользователь {user_id} отменил загрузку")
+        text = "Останавливаю загрузку..."
+    else:
+        text = "Нет активной загрузки"
+    await telegram_scheduler.send(
+        update.effective_chat.id, update.message.reply_text, text
+    )
+
+
 async def handle_link(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Обработчик ссылок на Rutube.
 
     Парсит ссылку, получает доступные разрешения и предлагает пользователю выбор.
+    Разбор ссылки записывается в отдельную трассу; её ID сохраняется
+    и попадает в трассы задач по этой ссылке (см. handle_resolution).
     """
     url = update.message.text
     logger.info(f"Получена ссылка от пользователя {update.effective_user.id}: {url}")
 
-    try:
-        # Создаём объект Rutube для работы с видео
-        ru = Rutube(url)
-        user_links[update.effective_user.id] = ru
-
-        # Получаем доступные разрешения видео
-        resolutions = ru.available_resolutions
-
-        # Создаём клавиатуру с кнопками разрешений
-        keyboard = [
-            [InlineKeyboardButton(text=res, callback_data=res)]
-            for res in resolutions
-        ]
-
-        await update.message.reply_text(
-            "Выбери разрешение:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при обработке ссылки: {e}", exc_info=True)
-        await update.message.reply_text(f"Ошибка: {e}")
+    trace_id = tracing.new_trace_id()
+    with tracing.span("bot.handle_link", trace_id=trace_id):
+        try:
+            # Создаём объект Rutube для работы с видео (запросы к API
+            # выполняются в потоке, event loop обрабатывает другие события)
+            ru = await asyncio.to_thread(resolve_link, url)
+
+            # Новая ссылка отменяет предзагрузку и загрузку предыдущей.
+            # Текст, который не разобран как ссылка, их не трогает
+            cancel_prefetch(update.effective_user.id)
+            if cancel_downloads(update.effective_user.id):
+                logger.info(
+                    f"Загрузка пользователя {update.effective_user.id} "
+                    f"отменена новой ссылкой"
+                )
+
+            user_links[update.effective_user.id] = (ru, trace_id)
+
+            await telegram_scheduler.send(
+                update.effective_chat.id,
+                update.message.reply_text,
+                "Выбери разрешение:",
+                reply_markup=resolution_keyboard(ru)
+            )
+
+            # В режиме очереди видео загружает воркер: предзагрузка
+            # в процессе бота не используется
+            if PREFETCH_ENABLED and not job_queue:
+                start_prefetch(update.effective_user.id, ru)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке ссылки: {e}", exc_info=True)
+            await telegram_scheduler.send(
+                update.effective_chat.id,
+                update.message.reply_text,
+                f"Ошибка: {e}"
+            )
+
+
+def resolve_link(url: str) -> Rutube:
+    """
+    Разбирает ссылку и загружает плейлист (блокирующие запросы к API).
+
+    Args:
+        url: Ссылка на видео
+
+    Returns:
+        Объект Rutube с загруженным плейлистом
+    """
+    ru = Rutube(url)
+    # Плейлист загружается при первом обращении: загружаем его здесь,
+    # а не при построении клавиатуры в event loop
+    ru.playlist
+    return ru
 
 
 async def handle_resolution(
@@ -98,28 +267,74 @@ async def handle_resolution(
     """
     Обработчик выбора разрешения видео.
 
+    Каждое нажатие (загрузка, превью, повторный выбор) — отдельная
+    задача со своей трассой: время, пока пользователь выбирал разрешение,
+    в неё не попадает. Трасса ссылки (см. handle_link) записывается
+    атрибутом link.
+    """
+    ru, link_trace_id = user_links.get(
+        update.callback_query.from_user.id
+    ) or (None, None)
+    with tracing.span(
+        "bot.handle_resolution",
+        trace_id=tracing.new_trace_id(),
+        link=link_trace_id,
+    ):
+        await download_resolution(update, context, ru)
+
+
+async def download_resolution(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, ru: Optional[Rutube]
+) -> None:
+    """
     Загружает видео в выбранном качестве и отправляет пользователю.
+
+    Args:
+        update: Нажатие кнопки разрешения
+        context: Контекст обработчика
+        ru: Объект Rutube выбранной ссылки (None — ссылка не найдена)
     """
     query = update.callback_query
     await query.answer()
 
     resolution = query.data  # Формат: "1920x1080" или "1080"
     user_id = query.from_user.id
-    logger.info(f"Пользователь {user_id} выбрал разрешение: {resolution}")
+    logger.info(
+        f"Пользователь {user_id} выбрал разрешение: {resolution} "
+        f"(трасса {tracing.current_trace_id()})"
+    )
 
-    # Получаем объект Rutube из хранилища
-    ru = user_links.get(user_id)
+    chat_id = query.message.chat_id
     if not ru:
-        await query.edit_message_text("Ссылка не найдена. Попробуй сначала.")
+        await telegram_scheduler.send(
+            chat_id,
+            query.edit_message_text,
+            "Ссылка не найдена. Попробуй сначала.",
+            key=query.message.message_id,
+        )
+        return
+
+    if resolution == PREVIEW_CALLBACK:
+        await send_preview(context.bot, ru, query.message, user_id)
         return
 
     # Создаём сообщение с прогрессом загрузки
-    progress_message = await query.edit_message_text(
-        f"🔄 Начинаю загрузку видео в {resolution}..."
+    progress_message = await telegram_scheduler.send(
+        chat_id,
+        query.edit_message_text,
+        f"🔄 Начинаю загрузку видео в {resolution}...",
+        key=query.message.message_id,
     )
 
+    # Загрузку можно отменить командой /cancel или новой ссылкой
+    cancel_event = register_download(user_id)
+
+    video = None
     video_path = None
     full_path = None
+    reservation = None
+    video_stream = None
+    progress_task = None
 
     try:
         # Извлекаем числовое значение разрешения (например, 1080 из "1920x1080")
@@ -128,11 +343,43 @@ async def handle_resolution(
             if "x" in resolution
             else int(resolution)
         )
+        user_history[user_id] = resolution_value
+
+        # Если включена очередь, загрузку и отправку выполнит воркер.
+        # Задача отслеживается в фоне, обработчик завершается сразу
+        if job_queue:
+            cancel_prefetch(user_id)
+            job_id = await asyncio.to_thread(
+                job_queue.enqueue,
+                ru.video_url, ru.video_id, resolution_value, chat_id
+            )
+            logger.info(f"Задача {job_id} поставлена в очередь")
+            context.application.create_task(track_queued_job(
+                job_id, user_id, progress_message, resolution, cancel_event
+            ))
+            # Загрузку снимает с учёта фоновое отслеживание задачи
+            cancel_event = None
+            return
 
         # Получаем видео с нужным разрешением
         video = ru.get_by_resolution(resolution_value)
+
+        # Предзагруженные сегменты сохраняем, только если выбрано то же видео
+        cancel_prefetch(user_id, keep=video)
+
+        # Резервируем место и пропускную способность под загрузку
+        reservation = await admit_download(
+            video, progress_message, cancel_event
+        )
+        if not reservation:
+            return
+
         video_path = f"{video.title}.mp4"
-        full_path = os.path.join("downloads", video_path)
+        full_path = os.path.join(DOWNLOAD_DIR, video_path)
+
+        # Без места на диске видео загружается в память (файл не создаётся)
+        if not reservation.disk:
+            video_stream = io.BytesIO()
 
         # Создаём очередь для обновления прогресса
         progress_queue = asyncio.Queue()
@@ -144,7 +391,14 @@ async def handle_resolution(
 
         # Запускаем загрузку видео
         download_task = asyncio.create_task(
-            run_download(video=video, path=full_path, progress_queue=progress_queue)
+            run_download(
+                video=video,
+                path=full_path,
+                progress_queue=progress_queue,
+                stream=video_stream,
+                reservation=reservation,
+                cancel=cancel_event,
+            )
         )
 
         # Ждем завершения загрузки
@@ -154,47 +408,73 @@ async def handle_resolution(
         await progress_queue.put((None, None))
         await progress_task
 
+        # Отмена, пришедшая после загрузки, отменяет отправку
+        if cancel_event.is_set():
+            raise DownloadCancelled(video.title)
+
         # Проверяем, что файл существует
-        if not os.path.exists(full_path):
-            await progress_message.edit_text("❌ Ошибка при загрузке видео")
+        if not video_stream and not os.path.exists(full_path):
+            await edit_status(progress_message, "❌ Ошибка при загрузке видео")
             return
 
         # Проверяем размер файла
-        file_size = os.path.getsize(full_path)
+        file_size = (
+            video_stream.getbuffer().nbytes if video_stream
+            else os.path.getsize(full_path)
+        )
         if file_size > MAX_TELEGRAM_FILE_SIZE:
-            await progress_message.edit_text(
+            await edit_status(
+                progress_message,
                 f"⚠️ Файл слишком большой для отправки "
                 f"({file_size // (1024 * 1024)}MB > {MAX_TELEGRAM_FILE_SIZE // (1024 * 1024)}MB)"
             )
             return
 
-        # Отправляем видео пользователю
-        await progress_message.edit_text("📤 Отправляю файл...")
-        with open(full_path, "rb") as video_file:
-            await context.bot.send_video(
-                chat_id=query.message.chat_id,
-                video=video_file,
-                caption=video.title,
-                read_timeout=60,
-                write_timeout=60,
-                connect_timeout=60,
-            )
+        # Отправляем видео пользователю. Статус отправки — обновление
+        # прогресса: он не занимает лимит чата раньше самого файла
+        telegram_scheduler.send_progress(
+            progress_message.chat_id,
+            progress_message.message_id,
+            progress_message.edit_text,
+            "📤 Отправляю файл...",
+        )
+        await upload_video(
+            context.bot, chat_id, full_path, video.title, stream=video_stream
+        )
 
-        await progress_message.edit_text("✅ Видео успешно отправлено!")
+        await edit_status(progress_message, "✅ Видео успешно отправлено!")
         logger.info(f"Видео успешно отправлено пользователю {user_id}")
 
+    except DownloadCancelled:
+        logger.info(f"Загрузка пользователя {user_id} отменена")
+        await edit_status(progress_message, "🚫 Загрузка отменена")
     except Exception as e:
         logger.error(f"Ошибка при загрузке видео: {e}", exc_info=True)
-        await progress_message.edit_text(f"❌ Произошла ошибка: {e}")
+        await edit_status(progress_message, f"❌ Произошла ошибка: {e}")
     finally:
+        if cancel_event:
+            unregister_download(user_id, cancel_event)
+
+        if progress_task and not progress_task.done():
+            progress_task.cancel()
+
+        if video and hasattr(video, "clear_prefetch"):
+            video.clear_prefetch()
+
         # Удаляем временный файл после отправки
-        if video_path and full_path and os.path.exists(full_path):
+        if (
+            video_path and full_path and not video_stream
+            and os.path.exists(full_path)
+        ):
             try:
                 os.remove(full_path)
                 logger.debug(f"Временный файл удалён: {full_path}")
             except Exception as e:
                 logger.error(f"Ошибка при удалении файла: {e}")
 
+        if reservation:
+            reservation.release()
+
 
 # =============================================================================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
@@ -235,11 +515,420 @@ async def update_progress_worker(
             stage = next(
                 (v for k, v in stages.items() if percent >= k), stages[100]
             )
-            await message.edit_text(f"{stage}\nПрогресс: {percent}%")
+            telegram_scheduler.send_progress(
+                message.chat_id,
+                message.message_id,
+                message.edit_text,
+                f"{stage}\nПрогресс: {percent}%",
+            )
+
+
+async def upload_video(
+    bot, chat_id: int, path: str, caption: str, stream=None
+) -> None:
+    """
+    Отправляет видеофайл в чат и логирует время отправки.
+
+    В локальном режиме Bot API сервер читает файл по пути,
+    иначе файл загружается через multipart.
+
+    Args:
+        bot: Объект Bot
+        chat_id: ID чата
+        path: Путь к файлу
+        caption: Подпись к видео
+        stream: Видео в памяти (потоковый режим, файла на диске нет)
+    """
+    size = stream.getbuffer().nbytes if stream else os.path.getsize(path)
+    mode = (
+        "stream" if stream else "path" if TELEGRAM_LOCAL_MODE else "multipart"
+    )
+
+    @tracing.traced("telegram.upload", mode=mode)
+    async def send():
+        started = time.perf_counter()
+        if stream:
+            stream.seek(0)
+            await bot.send_video(
+                chat_id=chat_id,
+                video=stream,
+                caption=caption,
+                filename=os.path.basename(path),
+                read_timeout=UPLOAD_TIMEOUT,
+                write_timeout=UPLOAD_TIMEOUT,
+                connect_timeout=UPLOAD_TIMEOUT,
+            )
+        elif TELEGRAM_LOCAL_MODE:
+            await bot.send_video(
+                chat_id=chat_id,
+                video=Path(path).resolve(),
+                caption=caption,
+                read_timeout=UPLOAD_TIMEOUT,
+                write_timeout=UPLOAD_TIMEOUT,
+                connect_timeout=UPLOAD_TIMEOUT,
+            )
+        else:
+            # Файл открывается заново при каждой попытке (повтор после 429)
+            with open(path, "rb") as video_file:
+                await bot.send_video(
+                    chat_id=chat_id,
+                    video=video_file,
+                    caption=caption,
+                    read_timeout=UPLOAD_TIMEOUT,
+                    write_timeout=UPLOAD_TIMEOUT,
+                    connect_timeout=UPLOAD_TIMEOUT,
+                )
+
+        logger.info(
+            f"Файл {size // 1024} KB отправлен ({mode}) "
+            f"за {time.perf_counter() - started:.2f} с"
+        )
+
+    with tracing.span("telegram.send", bytes=size):
+        await telegram_scheduler.send(chat_id, send)
+
+
+async def edit_status(message, text: str) -> None:
+    """
+    Изменяет статус загрузки в сообщении.
+
+    Статус отправляется с высоким приоритетом и отменяет ещё не
+    отправленные обновления прогресса этого сообщения.
+
+    Args:
+        message: Сообщение Telegram для обновления
+        text: Новый текст
+    """
+    await telegram_scheduler.send(
+        message.chat_id, message.edit_text, text, key=message.message_id
+    )
+
+
+def resolution_keyboard(ru: Rutube, preview: bool = True):
+    """
+    Клавиатура с кнопками разрешений.
+
+    Для длинных обычных видео добавляется кнопка превью (кроме режима
+    очереди: превью загружается процессом бота, а не воркером).
+
+    Args:
+        ru: Объект Rutube
+        preview: Показывать кнопку превью
+    """
+    keyboard = [
+        [InlineKeyboardButton(text=res, callback_data=res)]
+        for res in ru.available_resolutions
+    ]
+    if (
+        preview
+        and not job_queue
+        and ru.is_video
+        and ru.duration
+        and ru.duration >= PREVIEW_MIN_DURATION
+    ):
+        keyboard.append([InlineKeyboardButton(
+            text=f"👀 Превью {PREVIEW_SECONDS} с",
+            callback_data=PREVIEW_CALLBACK,
+        )])
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def send_preview(bot, ru: Rutube, message, user_id: int) -> None:
+    """
+    Отправляет первые PREVIEW_SECONDS секунд видео в худшем качестве.
+
+    Превью загружается в память в пределах бюджета памяти, его можно
+    отменить так же, как обычную загрузку. После отправки пользователю
+    снова предлагается выбрать разрешение для полной загрузки.
+
+    Args:
+        bot: Объект Bot
+        ru: Объект Rutube
+        message: Сообщение с клавиатурой разрешений
+        user_id: ID пользователя
+    """
+    chat_id = message.chat_id
+    await edit_status(message, "👀 Готовлю превью...")
+
+    # Превью отменяется командой /cancel или новой ссылкой
+    cancel_event = register_download(user_id)
+    reservation = None
+
+    try:
+        clip = await asyncio.to_thread(
+            ru.get_worst().preview, PREVIEW_SECONDS
+        )
+
+        # Превью всегда загружается в память: резервируем бюджет памяти
+        size = (
+            await asyncio.to_thread(clip.probe_size) or MAX_TELEGRAM_FILE_SIZE
+        )
+        reservation = admission.try_reserve(size, disk=False)
+        if not reservation:
+            await edit_status(
+                message, "⏳ Ожидаю освобождения памяти для превью..."
+            )
+            reservation = await admission.reserve(
+                size, ADMISSION_TIMEOUT, disk=False, cancel=cancel_event
+            )
+        if cancel_event.is_set():
+            raise DownloadCancelled(clip.title)
+        if not reservation:
+            await edit_status(message, "❌ Сервер перегружен, попробуй позже")
+            return
+
+        clip_stream = io.BytesIO()
+        await asyncio.to_thread(
+            clip.download, stream=clip_stream, workers=8,
+            progress_callback=reservation.progress, cancel=cancel_event,
+        )
+        if cancel_event.is_set():
+            raise DownloadCancelled(clip.title)
+        await upload_video(
+            bot, chat_id, f"{clip.title}.mp4", clip.title, stream=clip_stream
+        )
+    except DownloadCancelled:
+        logger.info(f"Превью пользователя {user_id} отменено")
+        await edit_status(message, "🚫 Загрузка отменена")
+        return
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке превью: {e}", exc_info=True)
+        await edit_status(message, f"❌ Не удалось загрузить превью: {e}")
+        return
+    finally:
+        unregister_download(user_id, cancel_event)
+        if reservation:
+            reservation.release()
+
+    await telegram_scheduler.send(
+        chat_id,
+        message.edit_text,
+        "Выбери разрешение для полной загрузки:",
+        reply_markup=resolution_keyboard(ru, preview=False),
+        key=message.message_id,
+    )
+
+
+def choose_prefetch_video(user_id: int, ru: Rutube):
+    """
+    Выбирает наиболее вероятное разрешение для предзагрузки.
+
+    Сначала используется последнее выбранное пользователем разрешение,
+    затем лучшее разрешение, которое укладывается в лимит Telegram.
+
+    Args:
+        user_id: ID пользователя
+        ru: Объект Rutube
+
+    Returns:
+        Объект видео или None
+    """
+    last = user_history.get(user_id)
+    if last in ru.available_resolutions:
+        return ru.get_by_resolution(last)
+
+    for video in reversed(list(ru.playlist)):
+        size = video.estimated_size
+        if size and size <= MAX_TELEGRAM_FILE_SIZE:
+            return video
+
+    return ru.get_worst()
+
+
+def start_prefetch(user_id: int, ru: Rutube) -> None:
+    """
+    Запускает предзагрузку первых сегментов в фоновом потоке.
+
+    Предзагрузка получает лимит из общего PREFETCH_TOTAL_BYTES (если он
+    исчерпан, не запускается) и освобождается через PREFETCH_TTL секунд,
+    если пользователь так и не выбрал разрешение.
+
+    Args:
+        user_id: ID пользователя
+        ru: Объект Rutube
+    """
+    if ru.is_yappy:
+        return
+
+    reserved = sum(limit for _, _, limit in user_prefetches.values())
+    max_bytes = min(PREFETCH_MAX_BYTES, PREFETCH_TOTAL_BYTES - reserved)
+    if max_bytes <= 0:
+        logger.debug(f"Лимит предзагрузки исчерпан ({reserved} байт)")
+        return
+
+    video = choose_prefetch_video(user_id, ru)
+    if not video:
+        return
+
+    cancel = threading.Event()
+    user_prefetches[user_id] = (video, cancel, max_bytes)
+    threading.Thread(
+        target=video.prefetch,
+        args=(max_bytes, cancel),
+        daemon=True,
+    ).start()
+    asyncio.get_running_loop().call_later(
+        PREFETCH_TTL, expire_prefetch, user_id, cancel
+    )
+    logger.debug(f"Предзагрузка {video} для пользователя {user_id}")
+
+
+def expire_prefetch(user_id: int, cancel: threading.Event) -> None:
+    """
+    Освобождает предзагрузку, если разрешение так и не выбрано.
+
+    Args:
+        user_id: ID пользователя
+        cancel: Событие отмены предзагрузки, для которой истёк срок
+    """
+    prefetch = user_prefetches.get(user_id)
+    if prefetch and prefetch[1] is cancel:
+        logger.debug(f"Предзагрузка пользователя {user_id} устарела")
+        cancel_prefetch(user_id)
+
+
+def cancel_prefetch(user_id: int, keep=None) -> None:
+    """
+    Останавливает предзагрузку пользователя.
+
+    Args:
+        user_id: ID пользователя
+        keep: Видео, чьи предзагруженные сегменты нужно сохранить
+    """
+    prefetch = user_prefetches.pop(user_id, None)
+    if not prefetch:
+        return
+
+    video, cancel, _ = prefetch
+    cancel.set()
+    if video is not keep:
+        video.clear_prefetch()
+
+
+def register_download(user_id: int) -> threading.Event:
+    """
+    Регистрирует загрузку пользователя.
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        Событие отмены загрузки
+    """
+    cancel_event = threading.Event()
+    user_downloads.setdefault(user_id, set()).add(cancel_event)
+    return cancel_event
+
+
+def unregister_download(user_id: int, cancel_event: threading.Event) -> None:
+    """
+    Удаляет завершённую загрузку пользователя.
+
+    Args:
+        user_id: ID пользователя
+        cancel_event: Событие отмены загрузки
+    """
+    downloads = user_downloads.get(user_id)
+    if downloads is None:
+        return
+
+    downloads.discard(cancel_event)
+    if not downloads:
+        del user_downloads[user_id]
+
+
+def cancel_downloads(user_id: int) -> bool:
+    """
+    Отменяет все загрузки пользователя.
+
+    Загрузка останавливается за ограниченное время: потоки, резерв
+    места и недокачанный файл освобождаются обработчиком загрузки.
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        True, если была активная загрузка
+    """
+    downloads = user_downloads.pop(user_id, None)
+    if not downloads:
+        return False
+
+    for cancel_event in downloads:
+        cancel_event.set()
+    return True
+
+
+async def admit_download(video, progress_message, cancel_event=None):
+    """
+    Резервирует место и пропускную способность под загрузку видео.
+
+    Если место на диске занято, небольшое видео загружается в память
+    (в пределах бюджета памяти), иначе задача ждёт освобождения места
+    на диске или в памяти.
+
+    Args:
+        video: Объект видео для загрузки
+        progress_message: Сообщение Telegram для статуса ожидания
+        cancel_event: Событие отмены (прерывает ожидание места)
+
+    Returns:
+        Резерв или None (статус с ошибкой уже показан)
+
+    Raises:
+        DownloadCancelled: Если загрузка отменена во время ожидания
+    """
+    size = await asyncio.to_thread(video.probe_size) or MAX_TELEGRAM_FILE_SIZE
+
+    reservation = admission.try_reserve(size)
+    if reservation:
+        return reservation
+
+    stream_allowed = (
+        STREAM_FALLBACK
+        and not TELEGRAM_LOCAL_MODE
+        and size <= MAX_TELEGRAM_FILE_SIZE
+        and admission.can_ever_fit(size, disk=False)
+    )
+    if stream_allowed:
+        reservation = admission.try_reserve(size, disk=False)
+        if reservation:
+            logger.info(f"Нет места на диске, {video} загружается в память")
+            return reservation
+
+    if not admission.can_ever_fit(size) and not stream_allowed:
+        await edit_status(
+            progress_message,
+            f"⚠️ Видео слишком большое для загрузки "
+            f"({size // (1024 * 1024)}MB)"
+        )
+        return None
+
+    await edit_status(
+        progress_message, "⏳ Ожидаю освобождения места для загрузки..."
+    )
+    reservation = await admission.reserve(
+        size, ADMISSION_TIMEOUT, cancel=cancel_event,
+        memory_fallback=stream_allowed,
+    )
+    if cancel_event and cancel_event.is_set():
+        if reservation:
+            reservation.release()
+        raise DownloadCancelled(video.title)
+    if not reservation:
+        await edit_status(
+            progress_message, "❌ Сервер перегружен, попробуй позже"
+        )
+    return reservation
 
 
 async def run_download(
-    video, path: str, progress_queue: asyncio.Queue
+    video,
+    path: str,
+    progress_queue: asyncio.Queue,
+    stream=None,
+    reservation=None,
+    cancel=None,
 ) -> None:
     """
     Запускает загрузку видео в отдельном потоке.
@@ -248,12 +937,20 @@ async def run_download(
         video: Объект видео для загрузки
         path: Путь для сохранения файла
         progress_queue: Очередь для обновления прогресса
+        stream: Поток для записи вместо файла (потоковый режим)
+        reservation: Резерв загрузки (уменьшается по мере загрузки)
+        cancel: Событие отмены загрузки
+
+    Raises:
+        DownloadCancelled: Если загрузка отменена
     """
     # Получаем event loop для использования в callback
     loop = asyncio.get_running_loop()
 
     def progress_callback(current: int, total: int) -> None:
         """Callback для обновления прогресса загрузки."""
+        if reservation:
+            reservation.progress(current, total)
         asyncio.run_coroutine_threadsafe(
             progress_queue.put((current, total)), loop
         ).result()
@@ -267,31 +964,170 @@ async def run_download(
     await asyncio.to_thread(
         video.download,
         path=os.path.dirname(path),
+        stream=stream,
         workers=8,  # Количество потоков для загрузки
         progress_callback=progress_callback,
+        cancel=cancel,
+        preallocate=PREALLOCATE_DOWNLOADS,
     )
 
 
+async def track_queued_job(
+    job_id: int,
+    user_id: int,
+    progress_message,
+    resolution: str,
+    cancel_event: threading.Event,
+) -> None:
+    """
+    Отслеживает выполнение задачи воркером (фоновая задача приложения).
+
+    Обработчик выбора разрешения не ждёт воркер, поэтому количество
+    задач в работе ограничено только числом воркеров.
+
+    Args:
+        job_id: ID задачи в очереди
+        user_id: ID пользователя
+        progress_message: Сообщение Telegram для обновления прогресса
+        resolution: Выбранное разрешение видео
+        cancel_event: Событие отмены (отменяет задачу в очереди)
+    """
+    try:
+        # Ожидание попадает в трассу задачи, которую пишет воркер
+        with tracing.span("bot.wait_job", trace_id=f"job-{job_id}"):
+            job = await wait_queued_job(
+                job_id, progress_message, resolution, cancel_event
+            )
+
+        if job.status == JobStatus.CANCELLED and not cancel_event.is_set():
+            await edit_status(
+                progress_message,
+                f"❌ Видео не загружено за {JOB_TIMEOUT // 60} мин, "
+                f"попробуй позже"
+            )
+        elif job.status == JobStatus.CANCELLED:
+            await edit_status(progress_message, "🚫 Загрузка отменена")
+        elif job.status == JobStatus.FAILED:
+            await edit_status(
+                progress_message, f"❌ Произошла ошибка: {job.error}"
+            )
+        else:
+            await edit_status(progress_message, "✅ Видео успешно отправлено!")
+            logger.info(f"Задача {job_id} выполнена воркером {job.worker}")
+    except Exception as e:
+        logger.error(
+            f"Ошибка при отслеживании задачи {job_id}: {e}", exc_info=True
+        )
+        await edit_status(progress_message, f"❌ Произошла ошибка: {e}")
+    finally:
+        unregister_download(user_id, cancel_event)
+
+
+async def wait_queued_job(
+    job_id: int,
+    progress_message,
+    resolution: str,
+    cancel_event: threading.Event,
+):
+    """
+    Ожидает завершения задачи, показывая её прогресс.
+
+    Задача, не завершённая за JOB_TIMEOUT секунд, отменяется.
+
+    Args:
+        job_id: ID задачи в очереди
+        progress_message: Сообщение Telegram для обновления прогресса
+        resolution: Выбранное разрешение видео
+        cancel_event: Событие отмены (отменяет задачу в очереди)
+
+    Returns:
+        Завершённая задача
+    """
+    progress_queue = asyncio.Queue()
+    progress_task = asyncio.create_task(
+        update_progress_worker(progress_message, resolution, progress_queue)
+    )
+
+    # Опрашиваем очередь, пока воркер не завершит задачу
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while True:
+        # Воркер замечает отмену при продлении аренды задачи
+        if cancel_event.is_set() or time.monotonic() >= deadline:
+            await asyncio.to_thread(job_queue.cancel, job_id)
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job.total:
+            await progress_queue.put((job.current, job.total))
+        if job.is_finished:
+            break
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    await progress_queue.put((None, None))
+    await progress_task
+    return job
+
+
 # =============================================================================
 # ТОЧКА ВХОДА
 # =============================================================================
 
-def main() -> None:
-    """Инициализация и запуск бота."""
-    # Создаем директорию для загрузок
-    if not os.path.exists("downloads"):
-        os.makedirs("downloads")
-        logger.info("Директория downloads создана")
+def build_application(builder: ApplicationBuilder) -> Application:
+    """
+    Создаёт приложение и регистрирует обработчики.
 
-    # Создаем приложение
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    События обрабатываются параллельно: иначе обработчик выбора
+    разрешения занимает приложение на всё время загрузки, а /cancel
+    и новая ссылка обрабатываются, только когда загрузка закончилась.
+
+    Args:
+        builder: Настроенный ApplicationBuilder (токен, Bot API сервер)
+
+    Returns:
+        Приложение бота
+    """
+    app = builder.concurrent_updates(True).build()
 
-    # Регистрируем обработчики
     app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("cancel", cancel))
     app.add_handler(
         MessageHandler(filters.TEXT & ~filters.COMMAND, handle_link)
     )
     app.add_handler(CallbackQueryHandler(handle_resolution))
+    return app
+
+
+def main() -> None:
+    """Инициализация и запуск бота."""
+    global job_queue
+
+    # Создаем директорию для загрузок
+    if not os.path.exists(DOWNLOAD_DIR):
+        os.makedirs(DOWNLOAD_DIR)
+        logger.info(f"Директория {DOWNLOAD_DIR} создана")
+    elif not JOB_QUEUE_DB:
+        # Загрузки выполняет только этот процесс: все файлы брошены
+        sweep_partial_files(DOWNLOAD_DIR, max_age=0)
+
+    tracing.configure(TRACE_FILE)
+
+    if HTTP2_ENABLED and use_http2():
+        logger.info("Сегменты загружаются по HTTP/2")
+
+    # Подключаем очередь задач для внешних воркеров
+    if JOB_QUEUE_DB:
+        job_queue = SQLiteJobQueue(JOB_QUEUE_DB)
+        logger.info(f"Загрузки выполняются воркерами через {JOB_QUEUE_DB}")
+
+    # Создаем приложение
+    builder = Application.builder().token(TELEGRAM_BOT_TOKEN)
+    if TELEGRAM_API_URL:
+        builder = (
+            builder
+            .base_url(TELEGRAM_API_URL)
+            .base_file_url(TELEGRAM_API_FILE_URL)
+            .local_mode(TELEGRAM_LOCAL_MODE)
+        )
+        logger.info(f"Используется Bot API сервер {TELEGRAM_API_URL}")
+    app = build_application(builder)
 
     # Запускаем бота
     logger.info("Бот запущен...")
@@ -0,0 +1,430 @@
+"""
+Модуль очереди задач на загрузку видео.
+
+Позволяет разделить бота на фронтенд (приём ссылок и выбор разрешения)
+и отдельные процессы-воркеры (загрузка и отправка видео), которые могут
+работать на других ядрах или машинах.
+
+Интерфейс задан абстрактным классом JobQueue, локальная реализация
+хранит задачи в SQLite (воркеры на той же машине). Любое другое
+хранилище (например, Redis для воркеров на других машинах) достаточно
+реализовать через тот же интерфейс.
+
+Воркер берёт задачу в аренду и продлевает её, пока работает. Если
+воркер упал, аренда истекает и задача возвращается в очередь.
+
+Автор: maxim_vdonsk
+"""
+
+from __future__ import annotations
+
+import abc
+import enum
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional, Text
+
+# =============================================================================
+# КОНСТАНТЫ
+# =============================================================================
+
+# Путь к базе очереди по умолчанию
+DEFAULT_DB_PATH = 'jobs.sqlite3'
+
+# Таймаут ожидания блокировки базы (в секундах)
+DB_TIMEOUT = 30
+
+# Время аренды задачи воркером (в секундах). Воркер продлевает аренду,
+# пока выполняет задачу; задача с истёкшей арендой считается брошенной
+LEASE_TIMEOUT = 60
+
+# Количество попыток выполнения задачи: брошенная задача возвращается
+# в очередь, пока попытки не исчерпаны, затем завершается с ошибкой
+MAX_ATTEMPTS = 2
+
+
+# =============================================================================
+# ПЕРЕЧИСЛЕНИЯ
+# =============================================================================
+
+class JobStatus(enum.Enum):
+    """Статусы задачи загрузки."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+# =============================================================================
+# ЗАДАЧА
+# =============================================================================
+
+class Job:
+    """Задача на загрузку и отправку видео."""
+
+    def __init__(
+        self,
+        job_id: int,
+        video_url: str,
+        video_id: str,
+        resolution: int,
+        chat_id: int,
+        status: JobStatus = JobStatus.QUEUED,
+        current: int = 0,
+        total: int = 0,
+        error: Optional[str] = None,
+        worker: Optional[str] = None,
+        attempts: int = 0,
+    ):
+        """
+        Инициализация задачи.
+
+        Args:
+            job_id: ID задачи в очереди
+            video_url: URL видео на Rutube
+            video_id: ID видео
+            resolution: Высота кадра (например, 1080)
+            chat_id: ID чата для отправки видео
+        """
+        self.id = job_id
+        self.video_url = video_url
+        self.video_id = video_id
+        self.resolution = resolution
+        self.chat_id = chat_id
+        self.status = status
+        self.current = current
+        self.total = total
+        self.error = error
+        self.worker = worker
+        self.attempts = attempts
+
+    def __repr__(self) -> str:
+        return f'Job({self.id}, {self.video_id}, {self.status.value})'
+
+    @property
+    def is_finished(self) -> bool:
+        """Завершена ли задача (успешно, с ошибкой или отменена)."""
+        return self.status in (
+            JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED
+        )
+
+
+# =============================================================================
+# АБСТРАКТНАЯ ОЧЕРЕДЬ
+# =============================================================================
+
+class JobQueue(abc.ABC):
+    """
+    Базовый класс очереди задач.
+
+    Реализации должны быть безопасны при обращении из нескольких процессов.
+    """
+
+    @abc.abstractmethod
+    def enqueue(
+        self,
+        video_url: str,
+        video_id: str,
+        resolution: int,
+        chat_id: int
+    ) -> int:
+        """Добавляет задачу в очередь и возвращает её ID."""
+        ...
+
+    @abc.abstractmethod
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Забирает самую старую задачу из очереди (или None).
+
+        Задача выдаётся в аренду на LEASE_TIMEOUT секунд. Перед выдачей
+        задачи с истёкшей арендой возвращаются в очередь.
+        """
+        ...
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """
+        Продлевает аренду задачи.
+
+        Returns:
+            False, если задача больше не выполняется этим воркером
+            (отменена или передана другому воркеру)
+        """
+        ...
+
+    @abc.abstractmethod
+    def expire_leases(self) -> int:
+        """
+        Возвращает в очередь задачи с истёкшей арендой.
+
+        Задачи, исчерпавшие MAX_ATTEMPTS попыток, завершаются с ошибкой.
+
+        Returns:
+            Количество обработанных задач
+        """
+        ...
+
+    @abc.abstractmethod
+    def report_progress(self, job_id: int, current: int, total: int) -> None:
+        """Сохраняет прогресс загрузки."""
+        ...
+
+    @abc.abstractmethod
+    def complete(self, job_id: int) -> None:
+        """Отмечает задачу выполненной."""
+        ...
+
+    @abc.abstractmethod
+    def fail(self, job_id: int, error: str) -> None:
+        """Отмечает задачу завершённой с ошибкой."""
+        ...
+
+    @abc.abstractmethod
+    def cancel(self, job_id: int) -> bool:
+        """
+        Отменяет задачу, если она ещё не завершена.
+
+        Воркер, выполняющий задачу, замечает отмену при опросе её
+        статуса и останавливает загрузку.
+
+        Returns:
+            True, если задача отменена
+        """
+        ...
+
+    @abc.abstractmethod
+    def get(self, job_id: int) -> Optional[Job]:
+        """Возвращает текущее состояние задачи."""
+        ...
+
+
+# =============================================================================
+# SQLITE
+# =============================================================================
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Очередь задач в локальной базе SQLite.
+
+    Подходит для нескольких процессов на одной машине. Для воркеров
+    на разных машинах нужно сетевое хранилище (например, Redis):
+    SQLite в режиме WAL не работает через сетевую файловую систему.
+    """
+
+    _SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS jobs ('
+        ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        ' video_url TEXT NOT NULL,'
+        ' video_id TEXT NOT NULL,'
+        ' resolution INTEGER NOT NULL,'
+        ' chat_id INTEGER NOT NULL,'
+        ' status TEXT NOT NULL,'
+        ' current INTEGER NOT NULL DEFAULT 0,'
+        ' total INTEGER NOT NULL DEFAULT 0,'
+        ' error TEXT,'
+        ' worker TEXT,'
+        ' attempts INTEGER NOT NULL DEFAULT 0,'
+        ' lease_until REAL,'
+        ' created REAL NOT NULL,'
+        ' updated REAL NOT NULL'
+        ')'
+    )
+
+    # Колонки, добавленные после первой версии схемы
+    _MIGRATIONS = (
+        ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+        ('lease_until', 'REAL'),
+    )
+
+    def __init__(
+        self,
+        path: Text = DEFAULT_DB_PATH,
+        lease_timeout: float = LEASE_TIMEOUT,
+        max_attempts: int = MAX_ATTEMPTS,
+        *args,
+        **kwargs
+    ):
+        """
+        Инициализация очереди.
+
+        Args:
+            path: Путь к файлу базы
+            lease_timeout: Время аренды задачи воркером (в секундах)
+            max_attempts: Количество попыток выполнения задачи
+        """
+        self._path = str(Path(path).resolve())
+        self._lease_timeout = lease_timeout
+        self._max_attempts = max_attempts
+
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(self._SCHEMA)
+
+            columns = {
+                row[1] for row in conn.execute('PRAGMA table_info(jobs)')
+            }
+            for name, definition in self._MIGRATIONS:
+                if name not in columns:
+                    conn.execute(
+                        f'ALTER TABLE jobs ADD COLUMN {name} {definition}'
+                    )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Новое соединение (по одному на вызов, чтобы работать из потоков)."""
+        return sqlite3.connect(
+            self._path, timeout=DB_TIMEOUT, isolation_level=None
+        )
+
+    @staticmethod
+    def _row_to_job(row: tuple) -> Job:
+        """Создание задачи из строки таблицы."""
+        (job_id, video_url, video_id, resolution, chat_id,
+         status, current, total, error, worker, attempts) = row
+        return Job(
+            job_id, video_url, video_id, resolution, chat_id,
+            JobStatus(status), current, total, error, worker, attempts
+        )
+
+    def enqueue(
+        self,
+        video_url: str,
+        video_id: str,
+        resolution: int,
+        chat_id: int
+    ) -> int:
+        """Добавляет задачу в очередь и возвращает её ID."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (video_url, video_id, resolution, chat_id,'
+                ' status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (video_url, video_id, resolution, chat_id,
+                 JobStatus.QUEUED.value, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Забирает самую старую задачу из очереди (или None)."""
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE не даёт двум воркерам забрать одну задачу
+            conn.execute('BEGIN IMMEDIATE')
+            self._expire_leases(conn)
+            row = conn.execute(
+                'SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1',
+                (JobStatus.QUEUED.value,)
+            ).fetchone()
+
+            if not row:
+                conn.execute('COMMIT')
+                return None
+
+            now = time.time()
+            conn.execute(
+                'UPDATE jobs SET status = ?, worker = ?, updated = ?,'
+                ' attempts = attempts + 1, lease_until = ?'
+                ' WHERE id = ?',
+                (JobStatus.RUNNING.value, worker, now,
+                 now + self._lease_timeout, row[0])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        return self.get(row[0])
+
+    def _expire_leases(self, conn: sqlite3.Connection) -> int:
+        """Обработка задач с истёкшей арендой (внутри транзакции)."""
+        now = time.time()
+        expired = ' WHERE status = ? AND lease_until < ?'
+        requeued = conn.execute(
+            'UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL,'
+            ' updated = ?' + expired + ' AND attempts < ?',
+            (JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now,
+             self._max_attempts)
+        ).rowcount
+        failed = conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, lease_until = NULL,'
+            ' updated = ?' + expired,
+            (JobStatus.FAILED.value, 'Воркер перестал отвечать', now,
+             JobStatus.RUNNING.value, now)
+        ).rowcount
+        return requeued + failed
+
+    def expire_leases(self) -> int:
+        """Возвращает в очередь задачи с истёкшей арендой."""
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                count = self._expire_leases(conn)
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        return count
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Продлевает аренду задачи."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET lease_until = ?'
+                ' WHERE id = ? AND status = ? AND worker = ?',
+                (now + self._lease_timeout, job_id,
+                 JobStatus.RUNNING.value, worker)
+            )
+            return cursor.rowcount > 0
+
+    def _update(self, job_id: int, **fields) -> None:
+        """Обновление полей выполняемой задачи."""
+        fields['updated'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with closing(self._connect()) as conn:
+            # Отменённая или брошенная задача не перезаписывается
+            conn.execute(
+                f'UPDATE jobs SET {columns} WHERE id = ? AND status = ?',
+                (*fields.values(), job_id, JobStatus.RUNNING.value)
+            )
+
+    def report_progress(self, job_id: int, current: int, total: int) -> None:
+        """Сохраняет прогресс загрузки."""
+        self._update(job_id, current=current, total=total)
+
+    def complete(self, job_id: int) -> None:
+        """Отмечает задачу выполненной."""
+        self._update(job_id, status=JobStatus.DONE.value, lease_until=None)
+
+    def fail(self, job_id: int, error: str) -> None:
+        """Отмечает задачу завершённой с ошибкой."""
+        self._update(
+            job_id, status=JobStatus.FAILED.value, error=error,
+            lease_until=None
+        )
+
+    def cancel(self, job_id: int) -> bool:
+        """Отменяет задачу, если она ещё не завершена."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, updated = ?'
+                ' WHERE id = ? AND status IN (?, ?)',
+                (JobStatus.CANCELLED.value, time.time(), job_id,
+                 JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+            )
+            return cursor.rowcount > 0
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """Возвращает текущее состояние задачи."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT id, video_url, video_id, resolution, chat_id,'
+                ' status, current, total, error, worker, attempts'
+                ' FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
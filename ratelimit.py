@@ -0,0 +1,281 @@
+"""
+Модуль планировщика исходящих запросов к Telegram Bot API.
+
+Ограничивает частоту запросов бота с учётом лимитов Telegram:
+- не более ~30 сообщений в секунду на всего бота
+- не более ~1 сообщения в секунду в личный чат
+- не более ~20 сообщений в минуту в группу
+
+Важные запросы (отправка файла, итоговый статус) ждут своей очереди
+и повторяются после ошибки 429 (RetryAfter). Обновления прогресса
+отправляются только при свободном запасе лимита: если лимит исчерпан,
+промежуточные обновления одного сообщения объединяются в последнее.
+
+Автор: maxim_vdonsk
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from telegram.error import RetryAfter
+
+# =============================================================================
+# КОНСТАНТЫ
+# =============================================================================
+
+logger = logging.getLogger(__name__)
+
+# Глобальный лимит бота (запросов в секунду)
+GLOBAL_RATE = 30
+
+# Лимит для личного чата (запросов в секунду)
+CHAT_RATE = 1
+
+# Лимит для группы (запросов в секунду)
+GROUP_RATE = 20 / 60
+
+# Допустимый всплеск запросов в один чат
+CHAT_BURST = 3
+
+# Доля глобального лимита, которую не занимают обновления прогресса
+PROGRESS_RESERVE = 0.3
+
+# Количество чатов, после которого удаляются неактивные счётчики
+MAX_CHAT_BUCKETS = 10000
+
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Инициализация ведра.
+
+        Args:
+            rate: Скорость пополнения (токенов в секунду)
+            capacity: Максимальное количество токенов
+        """
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Пополнение токенов за прошедшее время."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        """Текущее количество токенов."""
+        self._refill()
+        return self._tokens
+
+    @property
+    def is_full(self) -> bool:
+        """Ведро полное (давно не использовалось)."""
+        return self.tokens >= self._capacity
+
+    def delay(self, amount: float = 1) -> float:
+        """Время (в секундах) до появления amount токенов."""
+        missing = amount - self.tokens
+        return max(0.0, missing / self._rate)
+
+    def consume(self, amount: float = 1) -> None:
+        """Забирает токены (может уйти в минус после паузы 429)."""
+        self._refill()
+        self._tokens -= amount
+
+    def drain(self) -> None:
+        """Обнуляет запас токенов."""
+        self._refill()
+        self._tokens = min(self._tokens, 0)
+
+
+# =============================================================================
+# ПЛАНИРОВЩИК
+# =============================================================================
+
+class TelegramScheduler:
+    """
+    Планировщик исходящих запросов к Telegram.
+
+    Все методы вызываются из одного event loop.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        group_rate: float = GROUP_RATE,
+    ):
+        """
+        Инициализация планировщика.
+
+        Args:
+            global_rate: Лимит запросов бота в секунду
+            chat_rate: Лимит запросов в личный чат в секунду
+            group_rate: Лимит запросов в группу в секунду
+        """
+        self._global = TokenBucket(global_rate, global_rate)
+        self._global_rate = global_rate
+        self._chat_rate = chat_rate
+        self._group_rate = group_rate
+        self._chats: dict = {}
+        self._paused_until = 0.0
+        self._waiting = 0
+        # Отложенные обновления прогресса: (chat_id, ID сообщения) -> запрос
+        # (ID сообщений уникальны только внутри чата)
+        self._pending: dict = {}
+        self._drainers: dict = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """Счётчик запросов для чата (группы имеют отрицательный ID)."""
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._chats = {
+                    key: value for key, value in self._chats.items()
+                    if not value.is_full
+                }
+            rate = self._group_rate if chat_id < 0 else self._chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, CHAT_BURST)
+        return bucket
+
+    def _delay(self, chat_id: int, reserve: float = 0) -> float:
+        """Время до возможности отправить запрос в чат."""
+        return max(
+            self._paused_until - time.monotonic(),
+            self._global.delay(1 + reserve),
+            self._chat_bucket(chat_id).delay(),
+        )
+
+    def _consume(self, chat_id: int) -> None:
+        """Учитывает отправленный запрос."""
+        self._global.consume()
+        self._chat_bucket(chat_id).consume()
+
+    def _pause(self, error: RetryAfter) -> None:
+        """Пауза всех запросов после ошибки 429."""
+        logger.warning(f"Telegram flood control: пауза {error.retry_after} с")
+        self._paused_until = max(
+            self._paused_until, time.monotonic() + error.retry_after
+        )
+        self._global.drain()
+
+    async def send(
+        self,
+        chat_id: int,
+        func: Callable[..., Awaitable],
+        *args,
+        key: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Важный запрос: ждёт лимита и повторяется после 429.
+
+        Args:
+            chat_id: ID чата
+            func: Метод Bot API (например, bot.send_video)
+            key: ID сообщения; отложенные обновления прогресса
+                этого сообщения отменяются
+        """
+        if key is not None:
+            await self._cancel_progress((chat_id, key))
+
+        while True:
+            await self._acquire(chat_id)
+            try:
+                return await func(*args, **kwargs)
+            except RetryAfter as e:
+                self._pause(e)
+
+    async def _acquire(self, chat_id: int) -> None:
+        """
+        Ожидает лимита и учитывает запрос.
+
+        Пока важный запрос ждёт лимита, обновления прогресса
+        не отправляются. Само выполнение запроса (например, долгая
+        отправка файла) их не задерживает.
+        """
+        self._waiting += 1
+        try:
+            while True:
+                delay = self._delay(chat_id)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self._consume(chat_id)
+        finally:
+            self._waiting -= 1
+
+    def send_progress(
+        self,
+        chat_id: int,
+        key: int,
+        func: Callable[..., Awaitable],
+        *args,
+        **kwargs
+    ) -> None:
+        """
+        Обновление прогресса: отправляется при свободном лимите.
+
+        Не ждёт отправки. Если предыдущее обновление того же сообщения
+        ещё не отправлено, оно заменяется новым.
+
+        Args:
+            chat_id: ID чата
+            key: ID сообщения
+            func: Метод Bot API (например, message.edit_text)
+        """
+        key = (chat_id, key)
+        self._pending[key] = (func, args, kwargs)
+        if key not in self._drainers:
+            self._drainers[key] = asyncio.create_task(self._drain(key))
+
+    async def _drain(self, key: tuple) -> None:
+        """Отправка последнего отложенного обновления сообщения."""
+        chat_id = key[0]
+        try:
+            while key in self._pending:
+                delay = self._delay(chat_id, reserve=self._reserve)
+                if delay > 0 or self._waiting:
+                    await asyncio.sleep(max(delay, 1 / self._global_rate))
+                    continue
+
+                func, args, kwargs = self._pending.pop(key)
+                self._consume(chat_id)
+                try:
+                    await func(*args, **kwargs)
+                except RetryAfter as e:
+                    # Обновление прогресса не повторяем: придёт следующее
+                    self._pause(e)
+                except Exception as e:
+                    logger.warning(f"Ошибка обновления прогресса: {e}")
+        finally:
+            self._drainers.pop(key, None)
+
+    @property
+    def _reserve(self) -> float:
+        """Запас токенов, недоступный обновлениям прогресса."""
+        return self._global_rate * PROGRESS_RESERVE
+
+    async def _cancel_progress(self, key: tuple) -> None:
+        """Отменяет отложенные обновления прогресса сообщения."""
+        self._pending.pop(key, None)
+        drainer = self._drainers.pop(key, None)
+        if drainer:
+            drainer.cancel()
+            try:
+                await drainer
+            except asyncio.CancelledError:
+                pass
@@ -14,21 +14,25 @@
 from __future__ import annotations
 
 import abc
+import copy
 import enum
+import importlib
 import json
 import logging
+import os
 import re
-import sys
 import time
 from collections import deque
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import (
+    ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+)
 from pathlib import Path
-from threading import Thread
+from queue import Queue
+from threading import Event, Lock, Thread
 from typing import BinaryIO, List, Optional, Text, Union
+from urllib.parse import urlsplit
 
-import m3u8
-import requests
-from alive_progress import alive_bar
+import tracing
 
 # =============================================================================
 # КОНСТАНТЫ
@@ -43,6 +47,39 @@ TIMEOUT = 50
 # Максимальное количество попыток загрузки
 RETRY = 5
 
+# Размер блока при чтении сегмента (в байтах)
+CHUNK_SIZE = 64 * 1024
+
+# Интервал проверки отмены загрузки при ожидании сегментов (в секундах)
+CANCEL_CHECK_INTERVAL = 0.5
+
+# Длительность сегмента, если плейлист её не указывает (в секундах)
+DEFAULT_SEGMENT_DURATION = 6
+
+# Перцентиль задержек, после которого отправляется дублирующий запрос
+HEDGE_PERCENTILE = 95
+
+# Минимальное количество замеров для расчёта перцентиля
+HEDGE_MIN_SAMPLES = 10
+
+# Количество последних замеров задержки
+HEDGE_WINDOW = 100
+
+# Количество потоков для дублирующих запросов
+HEDGE_WORKERS = 2
+
+# Коэффициент сглаживания (EWMA) задержки и доли ошибок хоста
+MIRROR_EWMA_ALPHA = 0.2
+
+# Количество ошибок подряд, после которого хост перестаёт получать запросы
+BREAKER_FAILURES = 3
+
+# Пауза до пробного запроса к отключённому хосту (в секундах)
+BREAKER_COOLDOWN = 30
+
+# Максимальное количество HTTP/2 соединений (на все хосты)
+HTTP2_MAX_CONNECTIONS = 4
+
 # Шаблоны URL для API Rutube
 DATA_URL_TEMPLATE = (
     r'https://rutube.ru/api/play/options/{}/?'
@@ -57,6 +94,185 @@ YAPPY_URL_TEMPLATE = (
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.WARNING)
 
+# Атрибуты тега (значения могут быть в кавычках и содержать запятые)
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+# =============================================================================
+# ОТЛОЖЕННЫЕ ИМПОРТЫ
+# =============================================================================
+
+class _LazyModule:
+    """Модуль, который импортируется при первом обращении к атрибуту."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+m3u8 = _LazyModule('m3u8')
+requests = _LazyModule('requests')
+alive_progress = _LazyModule('alive_progress')
+httpx = _LazyModule('httpx')
+
+
+# =============================================================================
+# HTTP-ТРАНСПОРТ
+# =============================================================================
+
+# Общий HTTP/2 клиент процесса (None — используется HTTP/1.1 через requests)
+_http2_client = None
+_http2_lock = Lock()
+
+# Хосты (схема, адрес), которые ответили не по HTTP/2: запросы к ним идут
+# через HTTP/1.1 и не делят HTTP2_MAX_CONNECTIONS соединений клиента
+_http1_hosts: set = set()
+
+
+def use_http2(enabled: bool = True, prior_knowledge: bool = False) -> bool:
+    """
+    Включает HTTP/2 для запросов плейлистов и сегментов.
+
+    Все запросы к одному хосту (в том числе из разных загрузок)
+    мультиплексируются в общие соединения. Если httpx или h2
+    не установлены, остаётся HTTP/1.1. Хосты, которые не согласовали
+    HTTP/2 (нет h2 в ALPN или URL http://), после первого ответа
+    запрашиваются через HTTP/1.1 как без HTTP/2.
+
+    Args:
+        enabled: Включить или выключить HTTP/2
+        prior_knowledge: HTTP/2 без TLS и согласования (для локальных серверов)
+
+    Returns:
+        Используется ли HTTP/2
+    """
+    global _http2_client
+
+    with _http2_lock:
+        if _http2_client is not None:
+            _http2_client.close()
+            _http2_client = None
+        _http1_hosts.clear()
+
+        if not enabled:
+            return False
+
+        try:
+            importlib.import_module('h2')
+            _http2_client = httpx.Client(
+                http1=not prior_knowledge,
+                http2=True,
+                limits=httpx.Limits(max_connections=HTTP2_MAX_CONNECTIONS),
+                follow_redirects=True,
+            )
+        except ImportError as e:
+            logger.warning(f'HTTP/2 is unavailable, using HTTP/1.1: {e}')
+            return False
+
+    return True
+
+
+class _Http2Response:
+    """Ответ httpx с интерфейсом requests.Response в используемой части."""
+
+    __slots__ = ('_response',)
+
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def status_code(self) -> int:
+        """HTTP-статус ответа."""
+        return self._response.status_code
+
+    @property
+    def headers(self):
+        """Заголовки ответа."""
+        return self._response.headers
+
+    @property
+    def content(self) -> bytes:
+        """Тело ответа."""
+        return self._response.read()
+
+    @property
+    def text(self) -> str:
+        """Тело ответа как текст."""
+        self._response.read()
+        return self._response.text
+
+    def iter_content(self, chunk_size: int):
+        """Чтение тела ответа блоками."""
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e)
+
+    def close(self) -> None:
+        """Закрывает ответ и освобождает поток соединения."""
+        self._response.close()
+
+
+def _http_request(
+    method: str,
+    url: str,
+    timeout: Optional[tuple] = None,
+    stream: bool = False
+):
+    """
+    Запрос к CDN через HTTP/2 (если включён) или HTTP/1.1.
+
+    Ошибки httpx приводятся к исключениям requests, при ошибке протокола
+    запрос повторяется через HTTP/1.1. Хост, ответивший не по HTTP/2,
+    дальше запрашивается через HTTP/1.1.
+
+    Args:
+        method: HTTP-метод
+        url: URL запроса
+        timeout: Таймауты (подключение, чтение) в секундах
+        stream: Не читать тело ответа сразу
+    """
+    client = _http2_client
+    host = urlsplit(url)[:2]
+    if client is None or host in _http1_hosts:
+        return requests.request(method, url, timeout=timeout, stream=stream)
+
+    try:
+        request = client.build_request(
+            method,
+            url,
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0])
+            if timeout else None
+        )
+        response = client.send(request, stream=stream)
+        if response.http_version != 'HTTP/2' and host not in _http1_hosts:
+            _http1_hosts.add(host)
+            logger.info(f'HTTP/2 is not supported, using HTTP/1.1: {host[1]}')
+        return _Http2Response(response)
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(e)
+    except httpx.ProtocolError as e:
+        logger.warning(f'HTTP/2 error, retrying over HTTP/1.1: {url} - {e}')
+        return requests.request(method, url, timeout=timeout, stream=stream)
+    except httpx.HTTPError as e:
+        raise requests.exceptions.ConnectionError(e)
+
+
+def _http_get(
+    url: str,
+    timeout: Optional[tuple] = None,
+    stream: bool = False
+):
+    """GET-запрос к CDN (см. _http_request)."""
+    return _http_request('GET', url, timeout, stream)
+
 
 # =============================================================================
 # ПЕРЕЧИСЛЕНИЯ
@@ -69,6 +285,428 @@ class VideoType(enum.Enum):
     YAPPY = 'yappy'
 
 
+class BreakerState(enum.Enum):
+    """Состояния предохранителя хоста."""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+# =============================================================================
+# ИСКЛЮЧЕНИЯ
+# =============================================================================
+
+class SegmentCancelled(Exception):
+    """Загрузка сегмента отменена."""
+
+
+class DownloadCancelled(Exception):
+    """Загрузка видео отменена."""
+
+
+class MirrorUnavailable(Exception):
+    """Хост варианта временно отключён (предохранитель открыт)."""
+
+
+# =============================================================================
+# ЗАДЕРЖКИ СЕГМЕНТОВ
+# =============================================================================
+
+class _LatencyTracker:
+    """Скользящее окно задержек загрузки сегментов."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def add(self, latency: float) -> None:
+        """Добавляет замер (в секундах)."""
+        self._samples.append(latency)
+
+    def threshold(
+        self,
+        percentile: int = HEDGE_PERCENTILE
+    ) -> Optional[float]:
+        """Перцентиль задержек или None, если замеров недостаточно."""
+        samples = sorted(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, len(samples) * percentile // 100)
+        return samples[index]
+
+
+# =============================================================================
+# ЗДОРОВЬЕ ХОСТОВ
+# =============================================================================
+
+class _HostHealth:
+    """Статистика и состояние предохранителя одного хоста."""
+
+    __slots__ = ('latency', 'error_rate', 'failures', 'state', 'opened_at')
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.state = BreakerState.CLOSED
+        self.opened_at = 0.0
+
+    def score(self) -> float:
+        """Ожидаемое время успешной загрузки сегмента (меньше — лучше)."""
+        if self.latency is None:
+            # Хост без замеров пробуется первым
+            return 0.0
+        return self.latency / max(1.0 - self.error_rate, 0.05)
+
+    def probe_due(self, now: float) -> bool:
+        """Пора ли отправить пробный запрос отключённому хосту."""
+        return (
+            self.state != BreakerState.CLOSED
+            and now - self.opened_at >= BREAKER_COOLDOWN
+        )
+
+
+class _MirrorHealth:
+    """
+    Здоровье хостов вариантов, общее для всех загрузок процесса.
+
+    Для каждого хоста хранятся EWMA задержки сегмента, EWMA доли
+    ошибок и состояние предохранителя:
+    - closed — хост получает запросы
+    - open — после BREAKER_FAILURES ошибок подряд хост не получает
+      запросов (пока есть другие варианты)
+    - half_open — через BREAKER_COOLDOWN секунд хосту отправляется
+      один пробный запрос: успех включает хост, ошибка снова отключает
+
+    Потокобезопасен.
+    """
+
+    def __init__(self):
+        self._hosts: dict = {}
+        self._lock = Lock()
+
+    def _get(self, url: str) -> _HostHealth:
+        """Статистика хоста URL (вызывается под блокировкой)."""
+        host = urlsplit(url).netloc
+        health = self._hosts.get(host)
+        if health is None:
+            health = self._hosts[host] = _HostHealth()
+        return health
+
+    def rank(self, urls: List[str]) -> List[str]:
+        """
+        Сортирует URL по здоровью их хостов.
+
+        Первыми идут хосты, ожидающие пробного запроса, затем включённые
+        по возрастанию ожидаемого времени загрузки, последними —
+        отключённые. При равенстве сохраняется исходный порядок.
+        """
+        now = time.monotonic()
+        keys = {}
+        with self._lock:
+            for url in urls:
+                health = self._get(url)
+                if health.probe_due(now):
+                    keys[url] = (0, -1.0)
+                elif health.state == BreakerState.CLOSED:
+                    keys[url] = (0, health.score())
+                else:
+                    keys[url] = (1, health.score())
+        return sorted(urls, key=keys.__getitem__)
+
+    def acquire(self, url: str) -> bool:
+        """
+        Можно ли отправить запрос хосту.
+
+        Для отключённого хоста после паузы разрешается один пробный
+        запрос; следующий — не раньше чем через BREAKER_COOLDOWN.
+        """
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(url)
+            if health.state == BreakerState.CLOSED:
+                return True
+            if health.probe_due(now):
+                health.state = BreakerState.HALF_OPEN
+                health.opened_at = now
+                return True
+            return False
+
+    def record(self, url: str, latency: Optional[float]) -> None:
+        """
+        Учитывает результат запроса к хосту.
+
+        Args:
+            url: URL запроса
+            latency: Время загрузки (в секундах) или None при ошибке
+        """
+        with self._lock:
+            health = self._get(url)
+            failed = latency is None
+            health.error_rate += MIRROR_EWMA_ALPHA * (
+                float(failed) - health.error_rate
+            )
+
+            if not failed:
+                health.latency = latency if health.latency is None else (
+                    health.latency
+                    + MIRROR_EWMA_ALPHA * (latency - health.latency)
+                )
+                health.failures = 0
+                if health.state != BreakerState.CLOSED:
+                    logger.info(f"Mirror is back: {urlsplit(url).netloc}")
+                    health.state = BreakerState.CLOSED
+                return
+
+            health.failures += 1
+            if health.state == BreakerState.HALF_OPEN or (
+                health.state == BreakerState.CLOSED
+                and health.failures >= BREAKER_FAILURES
+            ):
+                if health.state == BreakerState.CLOSED:
+                    logger.warning(
+                        f"Mirror disabled: {urlsplit(url).netloc} "
+                        f"({health.failures} errors in a row)"
+                    )
+                health.state = BreakerState.OPEN
+                health.opened_at = time.monotonic()
+
+    def state(self, url: str) -> BreakerState:
+        """Состояние предохранителя хоста."""
+        with self._lock:
+            return self._get(url).state
+
+    def reset(self) -> None:
+        """Сбрасывает статистику всех хостов."""
+        with self._lock:
+            self._hosts.clear()
+
+
+# Здоровье хостов (общее для всех загрузок процесса)
+_mirror_health = _MirrorHealth()
+
+
+# =============================================================================
+# ПАРСИНГ M3U8
+# =============================================================================
+
+class _StreamInfo:
+    """Параметры варианта из тега #EXT-X-STREAM-INF."""
+
+    __slots__ = ('resolution', 'codecs', 'bandwidth')
+
+    def __init__(self, resolution, codecs, bandwidth):
+        self.resolution = resolution
+        self.codecs = codecs
+        self.bandwidth = bandwidth
+
+
+class _Variant:
+    """Вариант (рендишн) из мастер-плейлиста."""
+
+    __slots__ = ('uri', 'stream_info')
+
+    def __init__(self, uri: str, stream_info: _StreamInfo):
+        self.uri = uri
+        self.stream_info = stream_info
+
+
+class _MasterPlaylist:
+    """Мастер-плейлист: только список вариантов."""
+
+    __slots__ = ('playlists',)
+
+    def __init__(self, playlists: List[_Variant]):
+        self.playlists = playlists
+
+
+def _parse_master_playlist(text: str) -> _MasterPlaylist:
+    """
+    Быстрый разбор мастер-плейлиста.
+
+    Извлекает только разрешение, кодеки, битрейт и URI вариантов.
+    Интерфейс результата совпадает с m3u8.M3U8 в используемой части.
+
+    Raises:
+        ValueError: Если плейлист не удалось разобрать
+    """
+    if not text.startswith('#EXTM3U'):
+        raise ValueError('Not an m3u8 playlist')
+
+    playlists = []
+    stream_info = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            attributes = dict(_ATTRIBUTE_RE.findall(line, 18))
+            resolution = attributes.get('RESOLUTION')
+            if resolution:
+                width, _, height = resolution.partition('x')
+                resolution = (int(width), int(height))
+            codecs = attributes.get('CODECS')
+            bandwidth = attributes.get('BANDWIDTH')
+            stream_info = _StreamInfo(
+                resolution,
+                codecs.strip('"') if codecs else None,
+                int(bandwidth) if bandwidth else None,
+            )
+        elif line[0] != '#' and stream_info is not None:
+            playlists.append(_Variant(line, stream_info))
+            stream_info = None
+
+    if not playlists:
+        raise ValueError('No variants found')
+
+    return _MasterPlaylist(playlists)
+
+
+def _parse_segment_uris(text: str) -> List[str]:
+    """
+    Быстрый разбор списка сегментов из плейлиста варианта.
+
+    Raises:
+        ValueError: Если плейлист не удалось разобрать
+    """
+    if not text.startswith('#EXTM3U'):
+        raise ValueError('Not an m3u8 playlist')
+    if '#EXT-X-STREAM-INF' in text:
+        raise ValueError('Master playlist instead of media playlist')
+
+    return [
+        line for line in map(str.strip, text.splitlines())
+        if line and line[0] != '#'
+    ]
+
+
+def _parse_segment_durations(text: str) -> List[float]:
+    """
+    Длительности сегментов (#EXTINF) из плейлиста варианта.
+
+    Raises:
+        ValueError: Если длительность не удалось разобрать
+    """
+    return [
+        float(line[8:].split(',', 1)[0])
+        for line in map(str.strip, text.splitlines())
+        if line.startswith('#EXTINF:')
+    ]
+
+
+# =============================================================================
+# ДЕСКРИПТОРЫ
+# =============================================================================
+
+class _Descriptor:
+    """
+    Компактное неизменяемое описание объекта.
+
+    Хранит только данные, нужные для загрузки, поэтому дёшево кэшируется
+    и передаётся между процессами (to_dict/from_dict, pickle).
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()})'
+
+    def __reduce__(self):
+        return _restore_descriptor, (
+            type(self), tuple(getattr(self, name) for name in self.__slots__)
+        )
+
+    def to_dict(self) -> dict:
+        """Словарь из простых типов (пригоден для JSON)."""
+        return {
+            name: list(value) if isinstance(value, tuple) else value
+            for name in self.__slots__
+            for value in (getattr(self, name),)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Создание дескриптора из словаря to_dict()."""
+        return cls(**{
+            name: tuple(value) if isinstance(value, list) else value
+            for name, value in data.items()
+        })
+
+
+def _restore_descriptor(cls, values: tuple):
+    """Восстановление дескриптора при распаковке pickle."""
+    return cls(**dict(zip(cls.__slots__, values)))
+
+
+class RutubeVideoDescriptor(_Descriptor):
+    """Описание видео Rutube одного разрешения."""
+
+    __slots__ = (
+        'id', 'title', 'duration', 'resolution', 'codecs', 'bandwidth',
+        'base_uri', 'reserve_uri', 'segment_uris',
+    )
+
+
+class YappyVideoDescriptor(_Descriptor):
+    """Описание Yappy видео."""
+
+    __slots__ = ('id', 'link', 'resolution')
+
+
+class _PlaylistDescriptor(_Descriptor):
+    """Описание плейлиста: дескрипторы видео всех разрешений."""
+
+    __slots__ = ()
+
+    # Класс дескриптора видео (задаётся в наследниках)
+    _video_descriptor = None
+
+    def to_dict(self) -> dict:
+        """Словарь из простых типов (пригоден для JSON)."""
+        return {'videos': [video.to_dict() for video in self.videos]}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Создание дескриптора из словаря to_dict()."""
+        return cls(videos=tuple(
+            cls._video_descriptor.from_dict(video) for video in data['videos']
+        ))
+
+
+class RutubePlaylistDescriptor(_PlaylistDescriptor):
+    """Описание плейлиста Rutube."""
+
+    __slots__ = ('videos',)
+    _video_descriptor = RutubeVideoDescriptor
+
+
+class YappyPlaylistDescriptor(_PlaylistDescriptor):
+    """Описание плейлиста Yappy."""
+
+    __slots__ = ('videos',)
+    _video_descriptor = YappyVideoDescriptor
+
+
 # =============================================================================
 # АБСТРАКТНЫЕ КЛАССЫ
 # =============================================================================
@@ -100,6 +738,10 @@ class VideoAbstract(abc.ABC):
         """Запись видео в поток."""
         ...
 
+    def probe_size(self) -> Optional[int]:
+        """Оценка размера файла в байтах (None — неизвестен)."""
+        return None
+
     def _build_file_path(self, path: Text = None) -> str:
         """
         Строит полный путь к файлу.
@@ -127,36 +769,60 @@ class VideoAbstract(abc.ABC):
         stream: Optional[BinaryIO] = None,
         workers: int = 0,
         progress_callback=None,
+        cancel: Optional[Event] = None,
         *args,
         **kwargs
     ) -> None:
         """
         Загружает видео в файл или поток.
 
+        После установки cancel загрузка останавливается за ограниченное
+        время: новые сегменты не запрашиваются, ожидание повторов
+        прерывается, потоки освобождаются, недокачанный файл удаляется.
+
         Args:
             path: Путь для сохранения файла
             stream: Поток для записи
             workers: Количество потоков (0 = однопоточный)
             progress_callback: Callback для обновления прогресса
+            cancel: Событие отмены загрузки
+
+        Raises:
+            DownloadCancelled: Если загрузка отменена
         """
-        if stream:
-            self._write(
-                stream,
-                workers=workers,
-                progress_callback=progress_callback,
-                *args,
-                **kwargs
-            )
-        else:
-            file_path = self._build_file_path(path)
-            with open(file_path, 'wb') as file:
-                self._write(
-                    file,
-                    workers=workers,
-                    progress_callback=progress_callback,
-                    *args,
-                    **kwargs
-                )
+        cancel = cancel or Event()
+
+        with tracing.span(
+            'video.download', video=self.title, resolution=self.resolution,
+            workers=workers
+        ):
+            file_path = None if stream else self._build_file_path(path)
+            try:
+                if stream:
+                    self._write(
+                        stream,
+                        workers=workers,
+                        progress_callback=progress_callback,
+                        cancel=cancel,
+                        *args,
+                        **kwargs
+                    )
+                else:
+                    with open(file_path, 'wb') as file:
+                        self._write(
+                            file,
+                            workers=workers,
+                            progress_callback=progress_callback,
+                            cancel=cancel,
+                            *args,
+                            **kwargs
+                        )
+            except SegmentCancelled:
+                if not cancel.is_set():
+                    raise
+                if file_path and os.path.exists(file_path):
+                    os.remove(file_path)
+                raise DownloadCancelled(self.title) from None
 
 
 # =============================================================================
@@ -192,8 +858,54 @@ class RutubeVideo(VideoAbstract):
         self._base_path = playlist.uri
         self._resolution = playlist.stream_info.resolution
         self._codecs = playlist.stream_info.codecs
+        self._bandwidth = playlist.stream_info.bandwidth
         self._reserve_path = None
         self._segment_urls = None
+        self._segment_durations = None
+        self._init_download_state()
+
+    def _init_download_state(self) -> None:
+        """Состояние загрузки (не входит в дескриптор)."""
+        self._prefetched: dict = {}
+        self._segment_started: dict = {}
+        self._segment_mirrors: dict = {}
+        self._latencies = _LatencyTracker()
+
+    def describe(self) -> RutubeVideoDescriptor:
+        """Компактное описание видео."""
+        return RutubeVideoDescriptor(
+            id=self._id,
+            title=self._title,
+            duration=self._duration,
+            resolution=tuple(self._resolution),
+            codecs=self._codecs,
+            bandwidth=self._bandwidth,
+            base_uri=self._base_path,
+            reserve_uri=self._reserve_path,
+            segment_uris=tuple(self._segment_urls)
+            if self._segment_urls else None,
+        )
+
+    @classmethod
+    def from_descriptor(
+        cls, descriptor: RutubeVideoDescriptor
+    ) -> RutubeVideo:
+        """Создание видео из описания (без сетевых запросов)."""
+        video = cls.__new__(cls)
+        video._id = descriptor.id
+        video._title = descriptor.title
+        video._duration = descriptor.duration
+        video._base_path = descriptor.base_uri
+        video._resolution = descriptor.resolution
+        video._codecs = descriptor.codecs
+        video._bandwidth = descriptor.bandwidth
+        video._reserve_path = descriptor.reserve_uri
+        video._segment_urls = (
+            list(descriptor.segment_uris) if descriptor.segment_uris else None
+        )
+        video._segment_durations = None
+        video._init_download_state()
+        return video
 
     def __str__(self) -> str:
         return f'{self._title} ({self.resolution})'
@@ -211,23 +923,141 @@ class RutubeVideo(VideoAbstract):
         """Разрешение в формате 'WIDTHxHEIGHT'."""
         return 'x'.join(map(str, self._resolution))
 
+    @property
+    def estimated_size(self) -> Optional[int]:
+        """Оценка размера файла в байтах (битрейт × длительность)."""
+        if not self._bandwidth or not self._duration:
+            return None
+        return int(self._bandwidth * self._duration / 8)
+
+    def probe_size(self) -> Optional[int]:
+        """
+        Оценка размера файла в байтах.
+
+        Если битрейт или длительность неизвестны, размер первого
+        сегмента (Content-Length) умножается на количество сегментов.
+        """
+        if self.estimated_size:
+            return self.estimated_size
+
+        try:
+            urls = self._get_segment_urls()
+            size = self._get_segment_size(urls[0]) if urls else None
+        except Exception as e:
+            logger.warning(f"Cannot probe size: {self} - {e}")
+            return None
+        return size * len(urls) if size else None
+
+    def prefetch(self, max_bytes: int, cancel: Event) -> int:
+        """
+        Заранее загружает первые сегменты в память.
+
+        Загруженные сегменты используются при последующем download().
+        Прерывается при установке cancel или превышении max_bytes.
+
+        Args:
+            max_bytes: Максимальный объём загруженных данных
+            cancel: Событие отмены
+
+        Returns:
+            Количество загруженных байт
+        """
+        fetched = 0
+
+        try:
+            for uri in self._get_segment_urls():
+                if cancel.is_set() or uri in self._prefetched:
+                    break
+
+                r = _http_get(
+                    self._make_segment_uri(self._segment_paths[0], uri),
+                    timeout=(10, 30)
+                )
+                if r.status_code != 200 or cancel.is_set():
+                    break
+                if fetched + len(r.content) > max_bytes:
+                    break
+
+                self._prefetched[uri] = r.content
+                fetched += len(r.content)
+        except Exception as e:
+            logger.warning(f"Prefetch error: {self} - {e}")
+
+        return fetched
+
+    def clear_prefetch(self) -> None:
+        """Освобождает заранее загруженные сегменты."""
+        self._prefetched.clear()
+
+    def preview(self, seconds: float) -> RutubeVideo:
+        """
+        Превью: видео из первых сегментов длительностью от seconds.
+
+        Загружается как обычное видео (download()), но только первые
+        сегменты. Уже предзагруженные сегменты используются повторно.
+
+        Args:
+            seconds: Минимальная длительность превью
+
+        Returns:
+            Новый объект видео
+        """
+        urls = self._get_segment_urls()
+        durations = self._segment_durations
+        if not durations or len(durations) != len(urls):
+            average = (
+                self._duration / len(urls) if self._duration and urls
+                else DEFAULT_SEGMENT_DURATION
+            )
+            durations = [average] * len(urls)
+
+        # Хотя бы один сегмент: пустой список считается незагруженным
+        count = 0
+        covered = 0.0
+        while count < len(urls) and (covered < seconds or not count):
+            covered += durations[count]
+            count += 1
+
+        clip = copy.copy(self)
+        clip._title = f'{self._title} (preview)'
+        clip._duration = covered
+        clip._segment_urls = urls[:count]
+        clip._segment_durations = durations[:count]
+        clip._init_download_state()
+        clip._prefetched = {
+            uri: self._prefetched[uri]
+            for uri in clip._segment_urls if uri in self._prefetched
+        }
+        return clip
+
     def _get_segment_urls(self) -> List[str]:
         """Получает URL всех сегментов из m3u8 плейлиста."""
         if self._segment_urls:
             return self._segment_urls
 
-        r = requests.get(self._base_path)
-        if r.status_code != 200:
-            r = requests.get(self._reserve_path)
+        with tracing.span('playlist.fetch', url=self._base_path) as span:
+            r = _http_get(self._base_path)
             if r.status_code != 200:
-                raise Exception(
-                    f'Cannot get segments. Status code: {r.status_code}'
-                )
+                span.set(url=self._reserve_path)
+                r = _http_get(self._reserve_path)
+                if r.status_code != 200:
+                    raise Exception(
+                        f'Cannot get segments. Status code: {r.status_code}'
+                    )
 
-        data = m3u8.loads(r.text)
-        self._segment_urls = [
-            segment['uri'] for segment in data.data['segments']
-        ]
+            try:
+                self._segment_urls = _parse_segment_uris(r.text)
+                self._segment_durations = _parse_segment_durations(r.text)
+            except ValueError:
+                data = m3u8.loads(r.text)
+                self._segment_urls = [
+                    segment['uri'] for segment in data.data['segments']
+                ]
+                self._segment_durations = [
+                    segment.get('duration') or DEFAULT_SEGMENT_DURATION
+                    for segment in data.data['segments']
+                ]
+            span.set(segments=len(self._segment_urls))
 
         return self._segment_urls
 
@@ -238,115 +1068,526 @@ class RutubeVideo(VideoAbstract):
         segment = segment_uri.split("/")[-1]
         return f'{base}/{segment}'
 
-    def _get_segment_data(self, uri: str) -> requests.Response:
+    def _get_segment_data(
+        self,
+        uri: str,
+        cancel: Optional[Event] = None,
+        retries: int = RETRY
+    ) -> bytes:
         """
         Загружает сегмент с повторными попытками.
 
+        Результат каждой попытки учитывается в здоровье хоста.
+
         Args:
             uri: URL сегмента
+            cancel: Событие отмены (прерывает чтение и ожидание повтора)
+            retries: Количество попыток
 
         Returns:
-            Response с данными сегмента
+            Данные сегмента
+
+        Raises:
+            SegmentCancelled: Если загрузка отменена
         """
         r = None
-        retry = RETRY
+        retry = retries
 
         while retry > 0:
-            try:
-                r = requests.get(uri, timeout=(10, 30))
-                if r.status_code == 200:
-                    return r
-            except requests.exceptions.Timeout:
-                logger.warning(f"Timeout: {uri}")
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Error: {uri} - {e}")
+            if cancel and cancel.is_set():
+                raise SegmentCancelled(uri)
+
+            with tracing.span(
+                'segment.attempt', attempt=retries - retry + 1
+            ) as span:
+                started = time.monotonic()
+                try:
+                    r = _http_get(uri, timeout=(10, 30), stream=True)
+                    span.set(status=r.status_code)
+                    if r.status_code == 200:
+                        chunks = []
+                        for chunk in r.iter_content(CHUNK_SIZE):
+                            if cancel and cancel.is_set():
+                                r.close()
+                                raise SegmentCancelled(uri)
+                            chunks.append(chunk)
+                        _mirror_health.record(
+                            uri, time.monotonic() - started
+                        )
+                        return b''.join(chunks)
+                    r.close()
+                except requests.exceptions.Timeout:
+                    logger.warning(f"Timeout: {uri}")
+                    span.set(error='timeout')
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"Error: {uri} - {e}")
+                    span.set(error=str(e))
+                _mirror_health.record(uri, None)
 
             retry -= 1
-            time.sleep(TIMEOUT)
+            if retry == 0:
+                break
+            with tracing.span('segment.retry_wait'):
+                if cancel:
+                    if cancel.wait(TIMEOUT):
+                        raise SegmentCancelled(uri)
+                else:
+                    time.sleep(TIMEOUT)
 
         raise Exception(f'Error code: {r and r.status_code}')
 
-    def _get_segment_content(self, args: tuple) -> bytes:
-        """Получает содержимое сегмента."""
-        uri, bar = args
-        r = (
-            self._get_segment_data(
-                self._make_segment_uri(self._reserve_path, uri)
-            )
-            or self._get_segment_data(
-                self._make_segment_uri(self._base_path, uri)
-            )
+    @property
+    def _segment_paths(self) -> List[str]:
+        """
+        Пути вариантов для сегментов, начиная с самого здорового хоста.
+
+        При равном здоровье сначала идёт запасной вариант, затем основной.
+        """
+        return _mirror_health.rank(
+            [p for p in (self._reserve_path, self._base_path) if p]
         )
-        bar()
-        return r.content
+
+    def _fetch_segment(
+        self,
+        uri: str,
+        path: str,
+        cancel: Optional[Event] = None
+    ) -> bytes:
+        """
+        Одна попытка загрузить сегмент с указанного варианта.
+
+        Отключённый хост не запрашивается (кроме пробного запроса).
+
+        Raises:
+            MirrorUnavailable: Если хост отключён
+        """
+        url = self._make_segment_uri(path, uri)
+        if not _mirror_health.acquire(url):
+            raise MirrorUnavailable(url)
+
+        with tracing.span('segment.fetch', url=url) as span:
+            started = time.monotonic()
+            content = self._get_segment_data(url, cancel, retries=1)
+            self._latencies.add(time.monotonic() - started)
+            span.set(bytes=len(content))
+        return content
+
+    def _get_segment_content(
+        self,
+        uri: str,
+        cancel: Optional[Event] = None
+    ) -> bytes:
+        """
+        Получает содержимое сегмента.
+
+        Каждая из RETRY попыток обходит варианты по здоровью хостов: при
+        ошибке сегмент сразу запрашивается с другого варианта, а пауза
+        TIMEOUT выдерживается только после ошибки на всех вариантах.
+        Так разовая ошибка здорового хоста не отправляет сегмент на
+        отключённый, а отключённый хост не получает больше запросов,
+        чем разрешает его предохранитель.
+        """
+        with tracing.span('segment.get', segment=uri) as span:
+            content = self._prefetched.pop(uri, None)
+            if content is not None:
+                span.set(prefetched=True)
+                return content
+
+            self._segment_started[uri] = time.monotonic()
+            error = None
+            for attempt in range(RETRY):
+                for path in self._segment_paths:
+                    self._segment_mirrors[uri] = path
+                    try:
+                        return self._fetch_segment(uri, path, cancel)
+                    except SegmentCancelled:
+                        raise
+                    except MirrorUnavailable as e:
+                        error = error or e
+                    except Exception as e:
+                        error = e
+
+                if attempt == RETRY - 1:
+                    break
+                with tracing.span('segment.retry_wait'):
+                    if cancel:
+                        if cancel.wait(TIMEOUT):
+                            raise SegmentCancelled(uri)
+                    else:
+                        time.sleep(TIMEOUT)
+            raise error
+
+    @staticmethod
+    def _wait_futures(
+        futures,
+        cancel: Event,
+        timeout: Optional[float] = None,
+        return_when: str = FIRST_COMPLETED
+    ) -> tuple:
+        """
+        Ожидает запросы (как concurrent.futures.wait), проверяя отмену.
+
+        Args:
+            futures: Запросы
+            cancel: Событие отмены загрузки
+            timeout: Максимальное время ожидания (None — без ограничения)
+            return_when: FIRST_COMPLETED или ALL_COMPLETED
+
+        Returns:
+            Завершённые и незавершённые запросы
+
+        Raises:
+            SegmentCancelled: Если загрузка отменена
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancel.is_set():
+                raise SegmentCancelled('download cancelled')
+
+            interval = CANCEL_CHECK_INTERVAL
+            if deadline is not None:
+                interval = max(min(interval, deadline - time.monotonic()), 0)
+            done, not_done = wait(futures, interval, return_when)
+
+            if return_when == ALL_COMPLETED:
+                finished = not not_done
+            else:
+                finished = bool(done)
+            if finished or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                return done, not_done
+
+    def _wait_segment(
+        self,
+        uri: str,
+        future: Future,
+        segment_cancel: Event,
+        hedge_pool: ThreadPoolExecutor,
+        cancel: Event
+    ) -> bytes:
+        """
+        Ожидает сегмент, отправляя дублирующий запрос для отстающих.
+
+        Если сегмент загружается дольше перцентиля недавних задержек,
+        тот же сегмент запрашивается с самого здорового из других
+        вариантов. Используется первый успешный ответ, второй запрос
+        отменяется.
+
+        Args:
+            uri: URI сегмента
+            future: Основной запрос
+            segment_cancel: Событие отмены основного запроса
+            hedge_pool: Пул для дублирующих запросов
+            cancel: Событие отмены загрузки
+
+        Returns:
+            Данные сегмента
+
+        Raises:
+            SegmentCancelled: Если загрузка отменена
+        """
+        paths = self._segment_paths
+        threshold = self._latencies.threshold()
+
+        if len(paths) < 2 or threshold is None:
+            self._wait_futures([future], cancel)
+            return future.result()
+
+        while not future.done():
+            started = self._segment_started.get(uri)
+            elapsed = time.monotonic() - started if started else 0
+            if started and elapsed >= threshold:
+                break
+            self._wait_futures([future], cancel, threshold - elapsed)
+        else:
+            return future.result()
+
+        logger.debug(f"Hedged request: {uri} ({elapsed:.2f}s)")
+        hedge_path = next(
+            path for path in self._segment_paths
+            if path != self._segment_mirrors.get(uri)
+        )
+        hedge_cancel = Event()
+        hedge = hedge_pool.submit(
+            tracing.propagate(self._fetch_segment),
+            uri, hedge_path, hedge_cancel
+        )
+        pending = {future: segment_cancel, hedge: hedge_cancel}
+
+        error = None
+        try:
+            while pending:
+                done, _ = self._wait_futures(pending, cancel)
+                for winner in done:
+                    pending.pop(winner)
+                    if winner.exception() is None:
+                        for loser, loser_cancel in pending.items():
+                            loser_cancel.set()
+                            loser.cancel()
+                        return winner.result()
+                    error = winner.exception()
+        except SegmentCancelled:
+            hedge_cancel.set()
+            raise
+        raise error
 
     @staticmethod
-    def _write_from_deque(
-        deq: deque,
+    def _write_from_queue(
+        queue: Queue,
         stream: BinaryIO,
-        flag: list
+        cancel: Event
     ) -> None:
-        """Поток записи данных из очереди в файл."""
+        """
+        Поток записи данных из очереди в файл (до получения None).
+
+        После отмены загрузки оставшиеся в очереди данные не пишутся.
+        """
         while True:
-            if deq:
-                stream.write(deq.popleft())
-            if flag:
+            content = queue.get()
+            if content is None or cancel.is_set():
                 break
+            with tracing.span('disk.write', bytes=len(content)):
+                stream.write(content)
 
     def _write_threads(
         self,
         bar,
         stream: BinaryIO,
-        workers: int = 0,
-        progress_callback=None
+        workers: int,
+        progress_callback,
+        cancel: Event
     ) -> None:
         """Многопоточная запись видео."""
-        deq = deque(maxlen=sys.maxsize)
-        flag = []
+        queue = Queue()
         total_segments = len(self._get_segment_urls())
         processed_segments = 0
 
         writer = Thread(
-            target=self._write_from_deque,
-            args=(deq, stream, flag),
+            target=tracing.propagate(self._write_from_queue),
+            args=(queue, stream, cancel),
             daemon=True
         )
         writer.start()
 
-        with ThreadPoolExecutor(max_workers=workers) as pool:
-            for content in pool.map(
-                self._get_segment_content,
-                [(uri, bar) for uri in self._get_segment_urls()]
-            ):
-                deq.append(content)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS)
+        segments = []
+
+        try:
+            for uri in self._get_segment_urls():
+                segment_cancel = Event()
+                segments.append((
+                    uri,
+                    pool.submit(
+                        tracing.propagate(self._get_segment_content),
+                        uri, segment_cancel
+                    ),
+                    segment_cancel
+                ))
+
+            for uri, future, segment_cancel in segments:
+                queue.put(self._wait_segment(
+                    uri, future, segment_cancel, hedge_pool, cancel
+                ))
+                bar()
                 processed_segments += 1
 
                 if progress_callback:
                     progress_callback(processed_segments, total_segments)
-            else:
-                flag.append(True)
-                writer.join()
+        finally:
+            # Отменённые запросы не задерживают завершение загрузки:
+            # чтение прерывается на следующем блоке, ожидание повтора —
+            # сразу, ещё не начатые сегменты не запрашиваются
+            for _, _, segment_cancel in segments:
+                segment_cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            hedge_pool.shutdown(wait=False, cancel_futures=True)
+
+            # Поток записи завершается до закрытия файла
+            queue.put(None)
+            writer.join()
+
+    def _get_segment_size(self, uri: str) -> Optional[int]:
+        """Размер сегмента по Content-Length (HEAD-запрос) или None."""
+        content = self._prefetched.get(uri)
+        if content is not None:
+            return len(content)
+
+        for path in self._segment_paths:
+            try:
+                r = _http_request(
+                    'HEAD', self._make_segment_uri(path, uri), (10, 30)
+                )
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"HEAD error: {uri} - {e}")
+                continue
+
+            length = r.headers.get('Content-Length')
+            if r.status_code == 200 and length:
+                return int(length)
+        return None
+
+    @staticmethod
+    def _preallocate(stream: BinaryIO, size: int) -> None:
+        """Резервирует место под файл заданного размера."""
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(stream.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        stream.truncate(size)
+
+    def _write_segment_at(
+        self,
+        uri: str,
+        cancel: Event,
+        stream: BinaryIO,
+        lock: Lock,
+        offset: int,
+        size: int
+    ) -> None:
+        """
+        Загружает сегмент и записывает его по своему смещению.
+
+        Отмена проверяется под блокировкой: после выхода из загрузки
+        (и закрытия файла) ни один поток уже не пишет в его дескриптор.
+        """
+        content = self._get_segment_content(uri, cancel)
+        if len(content) != size:
+            raise Exception(
+                f'Segment size mismatch: {uri} ({len(content)} != {size})'
+            )
+
+        with tracing.span('disk.write', bytes=size, offset=offset):
+            with lock:
+                if cancel.is_set():
+                    raise SegmentCancelled(uri)
+                if hasattr(os, 'pwrite'):
+                    os.pwrite(stream.fileno(), content, offset)
+                else:
+                    stream.seek(offset)
+                    stream.write(content)
+
+    def _write_positional(
+        self,
+        bar,
+        stream: BinaryIO,
+        workers: int,
+        progress_callback,
+        cancel: Event
+    ) -> bool:
+        """
+        Многопоточная запись сегментов сразу по их смещениям в файле.
+
+        Размеры сегментов узнаются заранее (HEAD-запросы), файл
+        резервируется целиком, и каждый поток пишет свой сегмент сразу
+        после загрузки. Буфер для упорядочивания не нужен.
+
+        Returns:
+            False, если размеры сегментов неизвестны или поток
+            не является файлом (нужна обычная запись)
+        """
+        try:
+            stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return False
+
+        urls = self._get_segment_urls()
+        pool = ThreadPoolExecutor(max_workers=workers)
+        lock = Lock()
+        segments = []
+
+        try:
+            size_futures = [
+                pool.submit(self._get_segment_size, uri) for uri in urls
+            ]
+            self._wait_futures(size_futures, cancel, return_when=ALL_COMPLETED)
+            sizes = [future.result() for future in size_futures]
+            if None in sizes:
+                logger.info(f'Segment sizes are unknown: {self}')
+                return False
+
+            stream.flush()
+            self._preallocate(stream, sum(sizes))
+
+            offset = 0
+            for uri, size in zip(urls, sizes):
+                segment_cancel = Event()
+                segments.append((pool.submit(
+                    tracing.propagate(self._write_segment_at),
+                    uri, segment_cancel, stream, lock, offset, size
+                ), segment_cancel))
+                offset += size
+
+            pending = {future for future, _ in segments}
+            processed_segments = 0
+            while pending:
+                done, pending = self._wait_futures(pending, cancel)
+                for future in done:
+                    future.result()
+                    bar()
+                    processed_segments += 1
+
+                    if progress_callback:
+                        progress_callback(processed_segments, len(urls))
+        finally:
+            with lock:
+                for _, segment_cancel in segments:
+                    segment_cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return True
 
     def _write(
         self,
         stream: BinaryIO,
         workers: int = 0,
         progress_callback=None,
+        preallocate: bool = False,
+        cancel: Optional[Event] = None,
         *args,
         **kwargs
     ) -> None:
-        """Записывает видео в поток."""
+        """
+        Записывает видео в поток.
+
+        Args:
+            stream: Поток для записи
+            workers: Количество потоков (0 = однопоточный)
+            progress_callback: Callback для обновления прогресса
+            preallocate: Резервировать файл и писать сегменты
+                по смещениям в порядке поступления
+            cancel: Событие отмены загрузки
+
+        Raises:
+            SegmentCancelled: Если загрузка отменена
+        """
+        cancel = cancel or Event()
         total_segments = len(self._get_segment_urls())
         if total_segments == 0:
             return
 
-        with alive_bar(total_segments, title=self.title) as bar:
+        with alive_progress.alive_bar(
+            total_segments, title=self.title
+        ) as bar:
+            if workers and preallocate and self._write_positional(
+                bar, stream, workers, progress_callback, cancel
+            ):
+                return
+
             if workers:
-                self._write_threads(bar, stream, workers, progress_callback)
+                self._write_threads(
+                    bar, stream, workers, progress_callback, cancel
+                )
             else:
                 processed_segments = 0
                 for uri in self._get_segment_urls():
-                    stream.write(self._get_segment_content((uri, bar)))
+                    if cancel.is_set():
+                        raise SegmentCancelled(uri)
+                    stream.write(self._get_segment_content(uri, cancel))
+                    bar()
                     processed_segments += 1
 
                     if progress_callback:
@@ -376,6 +1617,19 @@ class YappyVideo(VideoAbstract):
         self._link = link
         self._resolution = (1920, 1080)
 
+    def describe(self) -> YappyVideoDescriptor:
+        """Компактное описание видео."""
+        return YappyVideoDescriptor(
+            id=self._id, link=self._link, resolution=self._resolution
+        )
+
+    @classmethod
+    def from_descriptor(cls, descriptor: YappyVideoDescriptor) -> YappyVideo:
+        """Создание видео из описания."""
+        video = cls(descriptor.id, descriptor.link)
+        video._resolution = descriptor.resolution
+        return video
+
     def __str__(self) -> str:
         return self.title
 
@@ -392,20 +1646,48 @@ class YappyVideo(VideoAbstract):
         """Разрешение в формате 'WIDTHxHEIGHT'."""
         return 'x'.join(map(str, self._resolution))
 
+    def probe_size(self) -> Optional[int]:
+        """Размер файла по Content-Length (HEAD-запрос) или None."""
+        try:
+            r = requests.head(
+                self._link, timeout=(10, 30), allow_redirects=True
+            )
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"HEAD error: {self._link} - {e}")
+            return None
+
+        length = r.headers.get('Content-Length')
+        return int(length) if r.status_code == 200 and length else None
+
     def _write(
         self,
         stream: Optional[BinaryIO] = None,
+        cancel: Optional[Event] = None,
         *args,
         **kwargs
     ) -> None:
-        """Загружает и записывает Yappy видео."""
-        with alive_bar(2, title=self.title) as bar:
-            r = requests.get(self._link)
+        """
+        Загружает и записывает Yappy видео.
+
+        Args:
+            stream: Поток для записи
+            cancel: Событие отмены (проверяется после каждого блока)
+
+        Raises:
+            SegmentCancelled: Если загрузка отменена
+        """
+        with alive_progress.alive_bar(2, title=self.title) as bar:
+            r = requests.get(self._link, timeout=(10, 30), stream=True)
             if r.status_code != 200:
+                r.close()
                 raise Exception(f'Error code: {r and r.status_code}')
 
             bar()
-            stream.write(r.content)
+            with r:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    if cancel and cancel.is_set():
+                        raise SegmentCancelled(self._link)
+                    stream.write(chunk)
             bar()
 
 
@@ -416,12 +1698,32 @@ class YappyVideo(VideoAbstract):
 class BasePlaylist(abc.ABC):
     """Базовый класс для плейлистов."""
 
-    _playlist: List[Union[RutubeVideo, YappyVideo]] = []
+    _playlist: List[Union[RutubeVideo, YappyVideo]]
+
+    # Классы видео и дескриптора плейлиста (задаются в наследниках)
+    _video_class = None
+    _descriptor_class = None
 
     @abc.abstractmethod
     def __init__(self, *args, **kwargs):
         ...
 
+    def describe(self):
+        """Компактное описание плейлиста."""
+        return self._descriptor_class(
+            videos=tuple(video.describe() for video in self._playlist)
+        )
+
+    @classmethod
+    def from_descriptor(cls, descriptor):
+        """Создание плейлиста из описания (без сетевых запросов)."""
+        playlist = cls.__new__(cls)
+        playlist._playlist = [
+            cls._video_class.from_descriptor(video)
+            for video in descriptor.videos
+        ]
+        return playlist
+
     def __iter__(self):
         return iter(self._playlist)
 
@@ -474,6 +1776,9 @@ class BasePlaylist(abc.ABC):
 class RutubePlaylist(BasePlaylist):
     """Плейлист обычных видео Rutube."""
 
+    _video_class = RutubeVideo
+    _descriptor_class = RutubePlaylistDescriptor
+
     def __init__(self, data, params: dict, *args, **kwargs):
         """
         Создание плейлиста из данных API.
@@ -498,6 +1803,9 @@ class RutubePlaylist(BasePlaylist):
 class YappyPlaylist(BasePlaylist):
     """Плейлист Yappy видео."""
 
+    _video_class = YappyVideo
+    _descriptor_class = YappyPlaylistDescriptor
+
     def __init__(self, video_id: str, *args, **kwargs):
         """
         Создание плейлиста с одним Yappy видео.
@@ -554,21 +1862,8 @@ class Rutube:
         self._playlist: Union[RutubePlaylist, YappyPlaylist, None] = None
         self._type = VideoType.VIDEO
 
-        if self._check_url():
-            if f'/{VideoType.SHORTS.value}/' in self._video_url:
-                self._type = VideoType.SHORTS
-            elif f'/{VideoType.YAPPY.value}/' in self._video_url:
-                self._type = VideoType.YAPPY
-
-            if self._type == VideoType.YAPPY:
-                self._video_id = self._get_video_id()
-            else:
-                self._video_id = self._get_video_id()
-                self._data_url = self._get_data_url()
-                self._data = self._get_data()
-                self._m3u8_url = self._get_m3u8_url()
-                self._m3u8_data = self._get_m3u8_data()
-                self._title = self._get_title()
+        with tracing.span('rutube.init', url=video_url):
+            self._init_video()
 
     def __len__(self) -> int:
         """Количество доступных версий видео."""
@@ -589,6 +1884,21 @@ class Rutube:
         """Является ли Yappy."""
         return self._type == VideoType.YAPPY
 
+    @property
+    def video_url(self) -> str:
+        """URL видео."""
+        return self._video_url
+
+    @property
+    def video_id(self) -> str:
+        """ID видео."""
+        return self._video_id
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Длительность видео в секундах (для Yappy неизвестна)."""
+        return getattr(self, '_duration', None)
+
     @property
     def playlist(self) -> Union[RutubePlaylist, YappyPlaylist, None]:
         """Плейлист с версиями видео."""
@@ -633,6 +1943,25 @@ class Rutube:
     # Приватные методы
     # -------------------------------------------------------------------------
 
+    def _init_video(self) -> None:
+        """Определение типа видео и загрузка данных о нём."""
+        if self._check_url():
+            if f'/{VideoType.SHORTS.value}/' in self._video_url:
+                self._type = VideoType.SHORTS
+            elif f'/{VideoType.YAPPY.value}/' in self._video_url:
+                self._type = VideoType.YAPPY
+
+            if self._type == VideoType.YAPPY:
+                self._video_id = self._get_video_id()
+            else:
+                self._video_id = self._get_video_id()
+                self._data_url = self._get_data_url()
+                self._data = self._get_data()
+                self._m3u8_url = self._get_m3u8_url()
+                self._m3u8_data = self._get_m3u8_data()
+                self._title = self._get_title()
+                self._duration = self._get_duration()
+
     def _get_data_url(self) -> str:
         """URL для получения данных о видео."""
         return DATA_URL_TEMPLATE.format(self._video_id)
@@ -659,13 +1988,15 @@ class Rutube:
 
     def _get_data(self) -> dict:
         """Получение данных из API."""
-        r = requests.get(self._data_url)
-        return json.loads(r.content)
+        with tracing.span('rutube.get_data'):
+            r = requests.get(self._data_url)
+            return json.loads(r.content)
 
     def _check_url(self) -> bool:
         """Проверка доступности видео."""
-        if requests.get(self._video_url).status_code != 200:
-            raise Exception(f'{self._video_url} is unavailable')
+        with tracing.span('rutube.check_url'):
+            if requests.get(self._video_url).status_code != 200:
+                raise Exception(f'{self._video_url} is unavailable')
         return True
 
     def _get_title(self) -> str:
@@ -674,6 +2005,11 @@ class Rutube:
             self._data.get('title')
         ) or self._video_id
 
+    def _get_duration(self) -> Optional[float]:
+        """Длительность видео в секундах (API отдаёт миллисекунды)."""
+        duration = self._data.get('duration')
+        return duration / 1000 if duration else None
+
     @staticmethod
     def _clean_title(title: str) -> str:
         """Удаление запрещённых символов из названия."""
@@ -701,7 +2037,12 @@ class Rutube:
             logger.debug(json.dumps(self._data, indent=2, ensure_ascii=False))
             raise
 
-    def _get_m3u8_data(self) -> m3u8.M3U8:
+    def _get_m3u8_data(self) -> Union[_MasterPlaylist, m3u8.M3U8]:
         """Загрузка и парсинг m3u8 плейлиста."""
-        r = requests.get(self._m3u8_url)
-        return m3u8.loads(r.text)
+        with tracing.span('rutube.get_m3u8_data'):
+            r = _http_get(self._m3u8_url)
+            try:
+                return _parse_master_playlist(r.text)
+            except ValueError as e:
+                logger.debug(f'Fallback to m3u8 parser: {e}')
+                return m3u8.loads(r.text)
@@ -0,0 +1,305 @@
+"""
+Отчёт по трассам задач загрузки (см. tracing.py).
+
+Читает файл JSON Lines и выводит:
+- сводку по длительности задач
+- время по этапам: статистику интервалов и долю каждого этапа
+  на критическом пути задачи
+- критический путь самых медленных задач
+
+Критический путь — цепочка интервалов, которая определила время
+задачи: для каждого интервала выбирается дочерний, завершившийся
+последним, затем дочерний, завершившийся до его начала, и так далее.
+Параллельные загрузки сегментов, не задержавшие задачу, в путь
+не попадают.
+
+Запуск:
+    python trace_report.py traces.jsonl [--slow 30] [--top 5]
+    python trace_report.py traces.jsonl --trace job-42
+
+Автор: maxim_vdonsk
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# =============================================================================
+# КОНСТАНТЫ
+# =============================================================================
+
+# Допуск при сравнении времени начала и конца интервалов (в секундах)
+EPSILON = 0.001
+
+# Атрибуты, которые выводятся в критическом пути
+SHOWN_ATTRIBUTES = (
+    'video', 'resolution', 'segment', 'url', 'attempt', 'status',
+    'bytes', 'mode', 'error', 'link',
+)
+
+
+# =============================================================================
+# ДЕРЕВО ИНТЕРВАЛОВ
+# =============================================================================
+
+class SpanNode:
+    """Интервал трассы с дочерними интервалами."""
+
+    def __init__(self, record: dict):
+        """
+        Инициализация узла.
+
+        Args:
+            record: Запись интервала из файла трассировки
+        """
+        self.id = record.get('span')
+        self.parent_id = record.get('parent')
+        self.name = record.get('name', '?')
+        self.start = record.get('start', 0.0)
+        self.duration = record.get('duration', 0.0)
+        self.attributes = record.get('attrs') or {}
+        self.error = record.get('error')
+        self.children: List[SpanNode] = []
+
+    @property
+    def end(self) -> float:
+        """Время окончания интервала."""
+        return self.start + self.duration
+
+    def describe(self) -> str:
+        """Название интервала с основными атрибутами."""
+        attributes = [
+            f'{key}={self.attributes[key]}'
+            for key in SHOWN_ATTRIBUTES if key in self.attributes
+        ]
+        if self.error:
+            attributes.append(f'error={self.error}')
+        return ' '.join([self.name, *attributes])
+
+
+class Trace:
+    """Все интервалы одной задачи."""
+
+    def __init__(self, trace_id: str, records: List[dict]):
+        """
+        Инициализация трассы.
+
+        Интервалы без родителя в файле (корневые или потерянные)
+        становятся дочерними для общего корня трассы.
+
+        Args:
+            trace_id: ID трассы
+            records: Записи интервалов
+        """
+        self.id = trace_id
+        self.spans = [SpanNode(record) for record in records]
+
+        by_id = {span.id: span for span in self.spans}
+        roots = []
+        for span in self.spans:
+            parent = by_id.get(span.parent_id)
+            (parent.children if parent else roots).append(span)
+
+        self.root = SpanNode({'name': trace_id})
+        self.root.children = roots
+        self.root.start = min(span.start for span in self.spans)
+        self.root.duration = max(
+            span.end for span in self.spans
+        ) - self.root.start
+
+    @property
+    def duration(self) -> float:
+        """Длительность задачи."""
+        return self.root.duration
+
+    @property
+    def failed(self) -> bool:
+        """Завершилась ли задача ошибкой."""
+        return any(span.error for span in self.root.children)
+
+    def critical_path(self) -> List[Tuple[int, SpanNode, float]]:
+        """
+        Критический путь трассы.
+
+        Returns:
+            Список (глубина, интервал, собственное время на пути)
+        """
+        path: List[Tuple[int, SpanNode, float]] = []
+        self._walk(self.root, 0, path)
+        return path
+
+    def _walk(
+        self,
+        node: SpanNode,
+        depth: int,
+        path: List[Tuple[int, SpanNode, float]]
+    ) -> None:
+        """Добавляет в путь интервал и цепочку его дочерних интервалов."""
+        chain = []
+        end = node.end
+        for child in sorted(
+            node.children, key=lambda span: span.end, reverse=True
+        ):
+            if child.end <= end + EPSILON:
+                chain.append(child)
+                end = child.start
+
+        own = node.duration - sum(child.duration for child in chain)
+        path.append((depth, node, max(own, 0.0)))
+        for child in reversed(chain):
+            self._walk(child, depth + 1, path)
+
+
+# =============================================================================
+# ЗАГРУЗКА И СТАТИСТИКА
+# =============================================================================
+
+def load_traces(path: str) -> Dict[str, Trace]:
+    """
+    Читает файл трассировки.
+
+    Args:
+        path: Путь к файлу JSON Lines
+
+    Returns:
+        Словарь ID трассы -> трасса
+    """
+    records: Dict[str, List[dict]] = defaultdict(list)
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Строка, оборванная при остановке процесса
+                continue
+            records[record.get('trace')].append(record)
+
+    return {
+        trace_id: Trace(trace_id, trace_records)
+        for trace_id, trace_records in records.items()
+    }
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль (ближайший ранг) отсортированного списка."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+def format_seconds(value: float) -> str:
+    """Длительность для вывода."""
+    if value < 1:
+        return f'{value * 1000:.0f}ms'
+    return f'{value:.2f}s'
+
+
+# =============================================================================
+# ОТЧЁТ
+# =============================================================================
+
+def print_summary(traces: List[Trace]) -> None:
+    """Сводка по длительности задач."""
+    durations = sorted(trace.duration for trace in traces)
+    failed = sum(trace.failed for trace in traces)
+    print(
+        f'Трасс: {len(traces)} (с ошибкой: {failed})  '
+        f'p50 {format_seconds(percentile(durations, 50))}  '
+        f'p95 {format_seconds(percentile(durations, 95))}  '
+        f'max {format_seconds(durations[-1])}'
+    )
+
+
+def print_stages(traces: List[Trace]) -> None:
+    """Время по этапам и их доля на критическом пути."""
+    durations: Dict[str, List[float]] = defaultdict(list)
+    critical: Dict[str, float] = defaultdict(float)
+    total = 0.0
+
+    for trace in traces:
+        for span in trace.spans:
+            durations[span.name].append(span.duration)
+        for depth, span, own in trace.critical_path():
+            if depth:
+                critical[span.name] += own
+        total += trace.duration
+
+    print()
+    print(
+        f'{"Этап":<24} {"кол-во":>7} {"p50":>8} {"p95":>8} '
+        f'{"max":>8} {"крит. путь":>11}'
+    )
+    for name, values in sorted(
+        durations.items(), key=lambda item: -critical[item[0]]
+    ):
+        values.sort()
+        share = critical[name] / total * 100 if total else 0.0
+        print(
+            f'{name:<24} {len(values):>7} '
+            f'{format_seconds(percentile(values, 50)):>8} '
+            f'{format_seconds(percentile(values, 95)):>8} '
+            f'{format_seconds(values[-1]):>8} {share:>10.1f}%'
+        )
+
+
+def print_critical_path(trace: Trace) -> None:
+    """Критический путь задачи."""
+    print()
+    print(f'Трасса {trace.id}: {format_seconds(trace.duration)}')
+    for depth, span, own in trace.critical_path()[1:]:
+        offset = span.start - trace.root.start
+        print(
+            f'  +{format_seconds(offset):>8} '
+            f'{format_seconds(span.duration):>8} '
+            f'(своё {format_seconds(own):>6})  '
+            f'{"  " * (depth - 1)}{span.describe()}'
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Точка входа."""
+    parser = argparse.ArgumentParser(description='Отчёт по трассам задач')
+    parser.add_argument('path', help='Файл трассировки (JSON Lines)')
+    parser.add_argument(
+        '--slow', type=float, default=None,
+        help='Показать критический путь задач дольше N секунд'
+    )
+    parser.add_argument(
+        '--top', type=int, default=3,
+        help='Сколько самых медленных задач показать'
+    )
+    parser.add_argument('--trace', help='Показать только одну трассу')
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.path)
+    if args.trace:
+        if args.trace not in traces:
+            parser.error(f'Трасса {args.trace} не найдена')
+        traces = {args.trace: traces[args.trace]}
+    if not traces:
+        print('Файл трассировки пуст')
+        return
+
+    ordered = sorted(
+        traces.values(), key=lambda trace: trace.duration, reverse=True
+    )
+    print_summary(ordered)
+    print_stages(ordered)
+
+    if args.slow is not None:
+        slow = [trace for trace in ordered if trace.duration >= args.slow]
+    else:
+        slow = ordered[:args.top]
+    for trace in slow:
+        print_critical_path(trace)
+
+
+if __name__ == '__main__':
+    main()
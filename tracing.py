@@ -0,0 +1,287 @@
+"""
+Модуль трассировки задач загрузки.
+
+Записывает интервалы (spans) жизненного цикла задачи: разбор ссылки,
+загрузку плейлистов, каждого сегмента (вместе с повторами), запись
+на диск и отправку в Telegram. Интервалы одной задачи связаны общим
+trace ID и выгружаются в локальный файл JSON Lines, по одному
+интервалу на строку. Отчёт по файлу строит trace_report.py.
+
+Пока трассировка не включена через configure(), span() ничего
+не записывает.
+
+Пример:
+    tracing.configure("traces.jsonl")
+    with tracing.span("job", trace_id="job-42"):
+        with tracing.span("download", resolution="1920x1080"):
+            ...
+
+Автор: maxim_vdonsk
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# =============================================================================
+# КОНСТАНТЫ
+# =============================================================================
+
+logger = logging.getLogger(__name__)
+
+# Текущий интервал (наследуется asyncio-задачами и asyncio.to_thread)
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    'current_span', default=None
+)
+
+# Экспортёр интервалов (None — трассировка выключена)
+_exporter: Optional[JsonLinesExporter] = None
+
+
+# =============================================================================
+# ЭКСПОРТ
+# =============================================================================
+
+class JsonLinesExporter:
+    """
+    Запись интервалов в файл JSON Lines.
+
+    Файл открывается в режиме добавления: каждая строка пишется одним
+    системным вызовом, поэтому в один файл могут писать несколько
+    процессов (бот и воркеры).
+    """
+
+    def __init__(self, path: str):
+        """
+        Инициализация экспортёра.
+
+        Args:
+            path: Путь к файлу трассировки
+        """
+        self._path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    @property
+    def path(self) -> str:
+        """Путь к файлу трассировки."""
+        return self._path
+
+    def export(self, record: dict) -> None:
+        """Записывает интервал в файл."""
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        try:
+            os.write(self._fd, line.encode())
+        except OSError as e:
+            logger.warning(f"Ошибка записи трассировки: {e}")
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        os.close(self._fd)
+
+
+# =============================================================================
+# ИНТЕРВАЛЫ
+# =============================================================================
+
+class Span:
+    """Интервал выполнения этапа задачи."""
+
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+        'start', '_started'
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: dict
+    ):
+        """
+        Инициализация интервала.
+
+        Args:
+            name: Название этапа
+            trace_id: ID трассы (задачи)
+            parent_id: ID родительского интервала
+            attributes: Дополнительные атрибуты
+        """
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, **attributes) -> None:
+        """Добавляет атрибуты интервала."""
+        self.attributes.update(attributes)
+
+    def to_dict(self, error: Optional[BaseException] = None) -> dict:
+        """Запись интервала для экспорта."""
+        record = {
+            'trace': self.trace_id,
+            'span': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration': round(time.perf_counter() - self._started, 6),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'attrs': self.attributes,
+        }
+        if error is not None:
+            record['error'] = f'{type(error).__name__}: {error}'
+        return record
+
+
+class _NoopSpan:
+    """Интервал-заглушка при выключенной трассировке."""
+
+    __slots__ = ()
+
+    trace_id = None
+
+    def set(self, **attributes) -> None:
+        """Атрибуты не сохраняются."""
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _new_id() -> str:
+    """Случайный ID интервала."""
+    return os.urandom(8).hex()
+
+
+# =============================================================================
+# ПУБЛИЧНЫЙ ИНТЕРФЕЙС
+# =============================================================================
+
+def configure(path: Optional[str]) -> None:
+    """
+    Включает трассировку с записью в файл (None — выключает).
+
+    Args:
+        path: Путь к файлу JSON Lines
+    """
+    global _exporter
+
+    if _exporter:
+        _exporter.close()
+    _exporter = JsonLinesExporter(path) if path else None
+    if _exporter:
+        logger.info(f"Трассировка задач записывается в {path}")
+
+
+def is_enabled() -> bool:
+    """Включена ли трассировка."""
+    return _exporter is not None
+
+
+def new_trace_id() -> str:
+    """Новый ID трассы."""
+    return _new_id()
+
+
+def current_trace_id() -> Optional[str]:
+    """ID трассы текущего интервала."""
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+@contextmanager
+def span(
+    name: str,
+    trace_id: Optional[str] = None,
+    **attributes
+) -> Iterator[Span]:
+    """
+    Интервал выполнения этапа.
+
+    Вложенные интервалы становятся дочерними. Если trace_id отличается
+    от трассы текущего интервала, начинается новая трасса. Исключение
+    записывается в поле error и пробрасывается дальше.
+
+    Args:
+        name: Название этапа
+        trace_id: ID трассы (по умолчанию — трасса текущего интервала
+            или новая)
+        **attributes: Атрибуты интервала
+    """
+    exporter = _exporter
+    if exporter is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    if parent and trace_id in (None, parent.trace_id):
+        current = Span(name, parent.trace_id, parent.span_id, attributes)
+    else:
+        current = Span(name, trace_id or new_trace_id(), None, attributes)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        exporter.export(current.to_dict(e))
+        raise
+    else:
+        exporter.export(current.to_dict())
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str, **attributes) -> Callable:
+    """
+    Декоратор: вызов функции (в том числе корутины) — интервал.
+
+    Args:
+        name: Название этапа
+        **attributes: Атрибуты интервала
+    """
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Переносит текущий интервал в другой поток.
+
+    Для пулов потоков вызывается отдельно для каждой задачи:
+        pool.submit(tracing.propagate(func), *args)
+    """
+    if _exporter is None:
+        return func
+
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,276 @@
+"""
+Воркер загрузки видео.
+
+Забирает задачи из очереди (см. jobs.py), скачивает видео, отправляет
+его в Telegram и сообщает боту о прогрессе через ту же очередь.
+Несколько воркеров можно запускать на разных машинах с общей очередью.
+
+Запуск:
+    python worker.py --workers 4 --db jobs.sqlite3
+
+Автор: maxim_vdonsk
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import socket
+import threading
+from multiprocessing import Process
+
+from telegram import Bot
+
+from bot import (
+    ADMISSION_TIMEOUT,
+    DOWNLOAD_BANDWIDTH,
+    DOWNLOAD_DISK_BUDGET,
+    HTTP2_ENABLED,
+    MAX_TELEGRAM_FILE_SIZE,
+    PREALLOCATE_DOWNLOADS,
+    TELEGRAM_API_FILE_URL,
+    TELEGRAM_API_URL,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_LOCAL_MODE,
+    TRACE_FILE,
+    upload_video,
+)
+import tracing
+from admission import AdmissionController, sweep_partial_files
+from jobs import DEFAULT_DB_PATH, Job, JobQueue, SQLiteJobQueue
+from rutube import DownloadCancelled, Rutube, use_http2
+
+# =============================================================================
+# КОНФИГУРАЦИЯ
+# =============================================================================
+
+logger = logging.getLogger(__name__)
+
+# Интервал опроса пустой очереди (в секундах)
+POLL_INTERVAL = 1.0
+
+# Количество потоков загрузки внутри одного воркера
+DOWNLOAD_THREADS = 8
+
+# Директория для временных файлов
+DOWNLOAD_DIR = "downloads"
+
+# Допуск загрузок (бюджеты действуют на процесс, свободное место на диске
+# проверяется общее)
+admission = AdmissionController(
+    DOWNLOAD_DIR, DOWNLOAD_DISK_BUDGET or None, DOWNLOAD_BANDWIDTH or None
+)
+
+
+# =============================================================================
+# ОБРАБОТКА ЗАДАЧ
+# =============================================================================
+
+async def send_video(chat_id: int, path: str, caption: str) -> None:
+    """
+    Отправляет видео пользователю.
+
+    Args:
+        chat_id: ID чата
+        path: Путь к файлу
+        caption: Подпись к видео
+    """
+    options = {}
+    if TELEGRAM_API_URL:
+        options = dict(
+            base_url=TELEGRAM_API_URL,
+            base_file_url=TELEGRAM_API_FILE_URL,
+            local_mode=TELEGRAM_LOCAL_MODE,
+        )
+
+    async with Bot(TELEGRAM_BOT_TOKEN, **options) as bot:
+        await upload_video(bot, chat_id, path, caption)
+
+
+def watch_job(
+    job_id: int, worker: str, queue: JobQueue, cancel: threading.Event
+) -> threading.Event:
+    """
+    Запускает поток, который продлевает аренду задачи и устанавливает
+    cancel, когда задача больше не принадлежит воркеру (бот отменил
+    её или аренда истекла и задача передана другому воркеру).
+
+    Args:
+        job_id: ID задачи
+        worker: Имя воркера
+        queue: Очередь задач
+        cancel: Событие отмены загрузки
+
+    Returns:
+        Событие остановки наблюдения
+    """
+    stop = threading.Event()
+
+    def watch() -> None:
+        while not stop.wait(POLL_INTERVAL):
+            try:
+                owned = queue.heartbeat(job_id, worker)
+            except Exception as e:
+                logger.warning(f"Не удалось продлить аренду задачи: {e}")
+                continue
+            if not owned:
+                cancel.set()
+                return
+
+    threading.Thread(target=watch, daemon=True).start()
+    return stop
+
+
+def process_job(job: Job, queue: JobQueue, cancel: threading.Event) -> None:
+    """
+    Загружает видео по задаче и отправляет его в чат.
+
+    Args:
+        job: Задача из очереди
+        queue: Очередь для отчёта о прогрессе
+        cancel: Событие отмены задачи
+
+    Raises:
+        DownloadCancelled: Если задача отменена
+    """
+    ru = Rutube(job.video_url)
+    video = ru.get_by_resolution(job.resolution)
+    if not video:
+        raise Exception(f"Разрешение {job.resolution} недоступно")
+
+    size = video.probe_size() or MAX_TELEGRAM_FILE_SIZE
+    if not admission.can_ever_fit(size):
+        raise Exception(
+            f"Видео слишком большое для загрузки ({size // (1024 * 1024)}MB)"
+        )
+    reservation = admission.reserve_blocking(
+        size, ADMISSION_TIMEOUT, cancel=cancel
+    )
+    if cancel.is_set():
+        if reservation:
+            reservation.release()
+        raise DownloadCancelled(video.title)
+    if not reservation:
+        raise Exception("Нет места для загрузки, попробуй позже")
+
+    full_path = os.path.join(DOWNLOAD_DIR, f"{video.title}.mp4")
+    last_percent = -1
+
+    def progress_callback(current: int, total: int) -> None:
+        """Сохраняет прогресс в очередь при изменении процента."""
+        nonlocal last_percent
+        reservation.progress(current, total)
+        percent = int((current / total) * 100)
+        if percent != last_percent:
+            last_percent = percent
+            queue.report_progress(job.id, current, total)
+
+    try:
+        video.download(
+            path=DOWNLOAD_DIR,
+            workers=DOWNLOAD_THREADS,
+            progress_callback=progress_callback,
+            cancel=cancel,
+            preallocate=PREALLOCATE_DOWNLOADS,
+        )
+
+        file_size = os.path.getsize(full_path)
+        if file_size > MAX_TELEGRAM_FILE_SIZE:
+            raise Exception(
+                f"Файл слишком большой для отправки "
+                f"({file_size // (1024 * 1024)}MB > "
+                f"{MAX_TELEGRAM_FILE_SIZE // (1024 * 1024)}MB)"
+            )
+
+        if cancel.is_set():
+            raise DownloadCancelled(video.title)
+        asyncio.run(send_video(job.chat_id, full_path, video.title))
+    finally:
+        if os.path.exists(full_path):
+            try:
+                os.remove(full_path)
+            except Exception as e:
+                logger.error(f"Ошибка при удалении файла: {e}")
+        reservation.release()
+
+
+def run_worker(name: str, db_path: str) -> None:
+    """
+    Основной цикл воркера.
+
+    Args:
+        name: Имя воркера (для отладки)
+        db_path: Путь к базе очереди
+    """
+    queue = SQLiteJobQueue(db_path)
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    sweep_partial_files(DOWNLOAD_DIR)
+    tracing.configure(TRACE_FILE)
+    if HTTP2_ENABLED:
+        use_http2()
+    logger.info(f"Воркер {name} запущен")
+
+    while True:
+        job = queue.claim(name)
+        if not job:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        logger.info(f"Воркер {name} взял задачу {job}")
+        cancel = threading.Event()
+        stop_watching = watch_job(job.id, name, queue, cancel)
+        try:
+            with tracing.span(
+                "worker.job", trace_id=f"job-{job.id}", worker=name,
+                video=job.video_url, resolution=job.resolution
+            ):
+                process_job(job, queue, cancel)
+            queue.complete(job.id)
+        except DownloadCancelled:
+            logger.info(
+                f"Задача {job.id} отменена или передана другому воркеру"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка в задаче {job.id}: {e}", exc_info=True)
+            queue.fail(job.id, str(e))
+        finally:
+            stop_watching.set()
+
+
+# =============================================================================
+# ТОЧКА ВХОДА
+# =============================================================================
+
+def main() -> None:
+    """Запуск нескольких процессов-воркеров."""
+    parser = argparse.ArgumentParser(description="Воркеры загрузки видео")
+    parser.add_argument(
+        "-n", "--workers", type=int, default=os.cpu_count() or 1,
+        help="Количество процессов"
+    )
+    parser.add_argument(
+        "--db", default=os.getenv("JOB_QUEUE_DB") or DEFAULT_DB_PATH,
+        help="Путь к базе очереди"
+    )
+    args = parser.parse_args()
+
+    hostname = socket.gethostname()
+    processes = [
+        Process(
+            target=run_worker,
+            args=(f"{hostname}-{i}", args.db),
+            daemon=True,
+        )
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    logger.info(f"Запущено воркеров: {len(processes)}")
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()